@@ -1,6 +1,9 @@
+import asyncio
 import os
 import sys
+import threading
 import warnings
+from queue import Queue
 
 # Set up paths before importing any src modules
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -13,6 +16,9 @@ if brain_src_path not in sys.path:
 
 from src.brain_core.config import Config
 from src.orchestration.orchestrator import AgentOrchestrator
+# Same module path as the orchestrator uses, so both see one shared cache
+from brain_core.semantic_cache import get_semantic_cache
+from brain_core.event_loop import new_event_loop
 
 
 warnings.filterwarnings(
@@ -23,6 +29,43 @@ warnings.filterwarnings(
 )
 
 
+class InputReader:
+    """Reads stdin on a daemon thread and hands each line to the event loop.
+
+    Unlike the default executor, which asyncio.Runner waits on at shutdown, a
+    daemon thread blocked in input() doesn't hold up exit on Ctrl-C.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._prompts = Queue()
+        self._lines = asyncio.Queue()
+        threading.Thread(target=self._run, name="stdin-reader", daemon=True).start()
+
+    def _run(self):
+        while True:
+            prompt = self._prompts.get()
+            try:
+                line = input(prompt)
+            except EOFError:
+                line = None
+            try:
+                self._loop.call_soon_threadsafe(self._lines.put_nowait, line)
+            except RuntimeError:
+                # Loop closed while we were waiting on input
+                return
+            if line is None:
+                return
+
+    async def readline(self, prompt: str) -> str:
+        """Prompt for one line; raises EOFError once stdin is closed."""
+        self._prompts.put(prompt)
+        line = await self._lines.get()
+        if line is None:
+            raise EOFError
+        return line
+
+
 class SimpleChatApp:
     """Simple chat application"""
 
@@ -44,29 +87,53 @@ class SimpleChatApp:
             print(f"❌ Initialization failed: {e}")
             sys.exit(1)
 
-    def chat(self, message: str):
-        """Run a simple chat conversation"""
-        self.orchestrator.start_chat(message)
+    async def chat(self, message: str):
+        """Run a simple chat conversation, printing tokens as they stream in"""
+        sys.stdout.write("Aven: ")
+        sys.stdout.flush()
+        async for chunk in self.orchestrator.start_chat_stream_async(message):
+            sys.stdout.write(chunk)
+            sys.stdout.flush()
+        sys.stdout.write("\n\n")
+        sys.stdout.flush()
+
+    async def warmup(self):
+        """Open the embedding connection for the semantic cache while the user types"""
+        try:
+            cache = get_semantic_cache()
+            if cache:
+                await asyncio.to_thread(cache.warmup)
+        except Exception as e:
+            print(f"⚠️ Warmup failed: {e}")
 
 
-def main():
+async def main():
     app = SimpleChatApp()
+    reader = InputReader(asyncio.get_running_loop())
+    warmup_task = asyncio.create_task(app.warmup())
 
     while True:
         try:
-            message = input("You: ").strip()
+            # Read input on the reader thread so background tasks keep running
+            message = (await reader.readline("You: ")).strip()
             if message.lower() in ['quit', 'exit', 'q']:
                 print("Returning to menu...\n")
                 break
             if message:
-                app.chat(message)
+                await app.chat(message)
 
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, EOFError):
             print("\n\nReturning to menu...\n")
             break
         except Exception as e:
             print(f"Error: {e}")
 
+    warmup_task.cancel()
+
 
 if __name__ == "__main__":
-    main()
+    try:
+        with asyncio.Runner(loop_factory=new_event_loop) as runner:
+            runner.run(main())
+    except KeyboardInterrupt:
+        pass
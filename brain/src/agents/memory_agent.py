@@ -1,19 +1,25 @@
 """
 Memory Agent - Extracts and organizes memories from conversations
 """
-from datetime import datetime
+import asyncio
+from collections import defaultdict
+from datetime import datetime, UTC
 import json
+import logging
 from typing import List, Dict, Any
 from autogen_agentchat.agents import AssistantAgent
 from autogen_agentchat.base import Response
-from autogen_agentchat.messages import TextMessage
 from autogen_core import CancellationToken
+from autogen_core.models import SystemMessage, UserMessage
 from brain_core.config import Config
+from brain_core.fast_json import JSONDecodeError, loads
 from memory.ltm_core.tag_manager import TagManager
 from pydantic import BaseModel, Field
 from typing import Dict, List
 from uuid import uuid4
 
+logger = logging.getLogger(__name__)
+
 # Output is like this:
 #
 # {
@@ -48,6 +54,8 @@ class MemoryItem(BaseModel):
     entities: List[str] = Field(default_factory=list, description="Key entities or concepts related to the memory.")
     timestamp: str = Field(default_factory=lambda: datetime.now().isoformat(), description="ISO-8601 string representing when the memory was extracted or last updated.")
 TaggedMemories = Dict[str, List[MemoryItem]]
+
+_json_decoder = json.JSONDecoder()
     
 
 
@@ -64,22 +72,25 @@ class MemoryAgent(AssistantAgent):
         """
         self.user_id = user_id
         self.tag_manager = TagManager(user_id=user_id)
-        
-
+        # Kept here so extraction calls don't reach into AssistantAgent internals
+        self.extraction_client = Config.model_client(index=0, json_output=True,  structured_output=True, cache=True)
+        self.extraction_system_message = SystemMessage(content=self._get_system_message())
 
         super().__init__(
             name="memory_organizer",
             description="Extracts and organizes memories from conversations",
-            model_client=Config.model_client(index=0, json_output=True,  structured_output=True),
-            system_message=self._get_system_message(),
+            model_client=self.extraction_client,
+            system_message=self.extraction_system_message.content,
             **kwargs
         )
 
     def _get_system_message(self) -> str:
-        """Generate system message for memory extraction."""
-        existing_tags = self.tag_manager.get_tags()
-        tags_str = ", ".join(existing_tags) if existing_tags else "None yet"
+        """
+        Generate system message for memory extraction.
 
+        The agent lives as long as its pooled MemoryManager, so the user's known
+        tags go into each extraction prompt instead of this message.
+        """
         return f"""
         You are a BEHAVIORAL MEMORY AGENT analyzing human conversation as an impartial observer.
         Purpose:
@@ -116,8 +127,6 @@ class MemoryAgent(AssistantAgent):
         - entities: List of key concepts (array of strings)
         - timestamp: ISO-8601 format (string) - will be auto-generated if not provided
 
-        Current known tags for user {self.user_id}: {tags_str}
-
         IMPORTANT: Return ONLY valid JSON with no explanations or extra text.
         """
 
@@ -132,74 +141,106 @@ class MemoryAgent(AssistantAgent):
             Dictionary with tags as keys and list of memories as values
         """
         try:
-            # Format conversation for analysis
-            conversation_text = self._format_conversation(conversation_history)
-            
-            # Create extraction prompt
-            prompt = (
-                "Analyze this conversation and extract memories grouped by tags.\n"
-                "Return ONLY valid JSON without extra text.\n\n"
-                f"CONVERSATION:\n{conversation_text}\n\n"
-                "Extract memories now:"
-            )
-            response = await self.on_messages(
-                messages=[TextMessage(content=prompt, source="user", created_at=datetime.now())],
-                cancellation_token=CancellationToken()
+            # Tag lookup may hit Supabase; keep it off the shared LTM loop
+            tags = await asyncio.to_thread(self.tag_manager.get_tags)
+            prompts = self._build_extraction_prompts(conversation_history, tags)
+
+            responses = await asyncio.gather(
+                *(self._run_extraction(prompt) for prompt in prompts),
+                return_exceptions=True
             )
-            # Parse JSON response
-            memories = self._parse_response(response.chat_message.content)
+
+            # Union the per-shard results by tag
+            memories: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+            for response in responses:
+                if isinstance(response, BaseException):
+                    logger.warning("Memory extraction shard failed: %s", response)
+                    continue
+                for tag, memory_list in self._parse_response(response).items():
+                    if isinstance(memory_list, list):
+                        memories[tag].extend(memory_list)
+            memories = dict(memories)
 
             if memories:
-                print(f"✓ Extracted {sum(len(v) for v in memories.values())} memories")
+                logger.info("Extracted %s memories", sum(len(v) for v in memories.values()))
 
             return memories
 
         except Exception as e:
-            print(f"❌ Error extracting memories: {e}")
+            logger.error("Error extracting memories: %s", e)
             return {}
 
+    def _build_extraction_prompts(self, conversation_history: List[Dict[str, Any]], tags: List[str]) -> List[str]:
+        """
+        Build one extraction prompt, or one per conversation slice when sharding is enabled.
+
+        The conversation is split into MEMORY_EXTRACTION_SHARDS consecutive
+        slices, so the shards together send it once rather than once each.
+        """
+        tags_str = ", ".join(tags) if tags else "None yet"
+        shards = max(1, min(Config.MEMORY_EXTRACTION_SHARDS, len(conversation_history)))
+        size = -(-len(conversation_history) // shards) or 1
+        slices = [
+            conversation_history[i:i + size] for i in range(0, len(conversation_history), size)
+        ] or [conversation_history]
+        return [
+            "Analyze this conversation and extract memories grouped by tags.\n"
+            "Return ONLY valid JSON without extra text.\n\n"
+            f"Current known tags for user {self.user_id}: {tags_str}\n\n"
+            f"CONVERSATION:\n{self._format_conversation(messages)}\n\n"
+            "Extract memories now:"
+            for messages in slices
+        ]
+
+    async def _run_extraction(self, prompt: str) -> str:
+        """Run one stateless extraction call so shards can run concurrently."""
+        result = await self.extraction_client.create(
+            [self.extraction_system_message, UserMessage(content=prompt, source="user")],
+            cancellation_token=CancellationToken()
+        )
+        return result.content if isinstance(result.content, str) else str(result.content)
+
     def _format_conversation(self, conversation_history: List[Dict[str, Any]]) -> str:
         """Format conversation history into readable text."""
-        formatted = []
-        for msg in conversation_history:
-            if isinstance(msg, dict):
-                role = msg.get("name", msg.get("role", "user"))
-                content = msg.get("content", "")
-                if content:
-                    formatted.append(f"{role}: {content}")
-
-        return "\n".join(formatted)
+        return "\n".join(
+            f"{msg.get('name') or msg.get('role', 'user')}: {content}"
+            for msg in conversation_history
+            if isinstance(msg, dict) and (content := msg.get("content"))
+        )
 
     def _parse_response(self, response: str) -> Dict[str, List[Dict[str, Any]]]:
         """Parse LLM response to extract JSON memories."""
         try:
-            # Find JSON in response
-            start = response.find("{")
-            end = response.rfind("}") + 1
-
-            if start != -1 and end > start:
-                json_str = response[start:end]
-                data = json.loads(json_str)
-
-                # Extract memories field if it exists, otherwise treat as direct memories dict
-                if isinstance(data, dict):
-                    if "memories" in data:
-                        memories = data["memories"]
-                    else:
-                        memories = data
-                    
-                    # Add timestamp and id to each memory if missing
-                    current_timestamp = datetime.now().isoformat()
-                    for tag, memory_list in memories.items():
-                        if isinstance(memory_list, list):
-                            for memory in memory_list:
-                                if isinstance(memory, dict):
-                                    memory["id"] = str(uuid4())
-                                    memory["timestamp"] = current_timestamp
-                    
-                    return memories
-
-        except json.JSONDecodeError as e:
-            print(f"⚠️ Error parsing JSON: {e}")
+            data = None
+            try:
+                # JSON output mode normally returns a bare object
+                data = loads(response)
+            except JSONDecodeError:
+                # Otherwise decode the object in place, starting at the first brace
+                start = response.find("{")
+                if start != -1:
+                    data, _end = _json_decoder.raw_decode(response, start)
+
+            # Extract memories field if it exists, otherwise treat as direct memories dict
+            if isinstance(data, dict):
+                if "memories" in data:
+                    memories = data["memories"]
+                else:
+                    memories = data
+                
+                # Always assign fresh ids/timestamps so responses served from the
+                # LLM cache never produce duplicate memory ids
+                current_timestamp = datetime.now(UTC).isoformat()
+                for tag, memory_list in memories.items():
+                    if isinstance(memory_list, list):
+                        for memory in memory_list:
+                            if isinstance(memory, dict):
+                                memory["id"] = uuid4().hex
+                                memory["timestamp"] = current_timestamp
+                
+                return memories
+
+        except JSONDecodeError as e:
+            logger.warning("Error parsing JSON: %s", e)
 
         return {}
@@ -1,6 +1,65 @@
+import functools
 from typing import List, Dict, Any, Optional
 from autogen_agentchat.agents import AssistantAgent
 from brain_core.config import Config
+from brain_core.fast_json import dumps, loads
+
+
+# Static instructions first and the per-user tool catalog last, so the
+# provider's automatic prompt caching can reuse the shared prefix.
+_SYS_AGENT_TMPL = """You are the System Agent. Your role is to execute system-level actions based on user instructions.
+
+CRITICAL RESPONSE FORMAT:
+You MUST respond ONLY with a JSON object in this exact format:
+{{ "action": "", "id": "" }}
+
+Rules:
+- "action": what needs to be done with clear request.
+- "id": The tool ID to use (must match one of the available tool IDs)
+- Return ONLY the JSON object, nothing else
+- No additional text, explanations, or formatting
+- If no matching action is found, return: {{ "action": "", "id": "" }}
+
+Examples:
+- User: "search for files"
+  Response: {{ "action": "open my last christmas presentation", "id": "tool_123" }}
+
+- User: "send email"
+  Response: {{ "action": "send an email to john@example.com containing the subject 'Hello' and the body 'How are you?'", "id": "tool_456" }}
+
+Remember: Return ONLY the JSON object in the format {{ "action": "", "id": "" }}
+
+Available Tools:
+{tools_json}"""
+
+
+@functools.lru_cache(maxsize=16)
+def _build_system_prompt(tools_key: str) -> str:
+    """
+    Render the System Agent prompt once per distinct tool catalog.
+
+    ``tools_key`` is the compact JSON of the tools, so the indented catalog is
+    only produced on a cache miss.
+    """
+    tools = loads(tools_key)
+    if not tools:
+        tools_json = "[]"
+    elif Config.COMPACT_TOOL_CATALOG:
+        tools_json = _compact_catalog(tools)
+    else:
+        tools_json = dumps(tools, indent=True)
+    return _SYS_AGENT_TMPL.format(tools_json=tools_json)
+
+
+def _compact_catalog(tools: List[Dict[str, Any]]) -> str:
+    """One tab-separated line per tool; roughly half the tokens of indented JSON."""
+    if any(tool.get("description") for tool in tools):
+        lines = ["ID\tNAME\tDESC"]
+        lines.extend(f"{t.get('id', '')}\t{t.get('name', '')}\t{t.get('description', '')}" for t in tools)
+    else:
+        lines = ["ID\tNAME"]
+        lines.extend(f"{t.get('id', '')}\t{t.get('name', '')}" for t in tools)
+    return "\n".join(lines)
 
 
 class SystemAgent(AssistantAgent):
@@ -19,37 +78,11 @@ class SystemAgent(AssistantAgent):
         super().__init__(
             name=name,
             description="Executes real system-level commands when instructed by other agents.",
-            model_client=Config.model_client(index=0, json_output=True),
+            model_client=Config.model_client(index=0, json_output=True, cache=True),
             system_message=self._get_system_message(),
             **kwargs
         )
 
     def _get_system_message(self) -> str:
         """Define minimal, execution-focused behavior for the System Agent."""
-        import json
-        tools_json = json.dumps(self.tools, indent=2) if self.tools else "[]"
-
-        return f"""You are the System Agent. Your role is to execute system-level actions based on user instructions.
-
-Available Tools:
-{tools_json}
-
-CRITICAL RESPONSE FORMAT:
-You MUST respond ONLY with a JSON object in this exact format:
-{{ "action": "", "id": "" }}
-
-Rules:
-- "action": what needs to be done with clear request.
-- "id": The tool ID to use (must match one of the available tool IDs)
-- Return ONLY the JSON object, nothing else
-- No additional text, explanations, or formatting
-- If no matching action is found, return: {{ "action": "", "id": "" }}
-
-Examples:
-- User: "search for files"
-  Response: {{ "action": "open my last christmas presentation", "id": "tool_123" }}
-
-- User: "send email"
-  Response: {{ "action": "send an email to john@example.com containing the subject 'Hello' and the body 'How are you?'", "id": "tool_456" }}
-
-Remember: Return ONLY the JSON object in the format {{ "action": "", "id": "" }}"""
+        return _build_system_prompt(dumps(self.tools))
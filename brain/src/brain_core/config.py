@@ -1,5 +1,6 @@
 import os
 from autogen_ext.models.openai import AzureOpenAIChatCompletionClient
+from autogen_ext.models.cache import ChatCompletionCache
 from azure.core.credentials import AzureKeyCredential
 from dotenv import load_dotenv
 import psycopg2
@@ -20,10 +21,53 @@ class Config:
         "AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "")
 
     RELAY_SERVER_URL: str = os.getenv("RELAY_SERVER_URL", "")
+    # Authenticate at the WebSocket handshake (device_id in the URL query, token in an
+    # Authorization header) instead of a registration frame. Requires relay server support.
+    RELAY_V2: bool = os.getenv("RELAY_V2", "false").lower() == "true"
+    # Send intents as binary frames of UTF-8 JSON. Requires relay server support.
+    RELAY_BINARY_FRAMES: bool = os.getenv("RELAY_BINARY_FRAMES", "false").lower() == "true"
+    # Coalesce intents sent within a short window into one {"type": "batch"} frame.
+    # Requires relay server support for batch frames, so it is off by default.
+    RELAY_BATCH_INTENTS: bool = os.getenv("RELAY_BATCH_INTENTS", "false").lower() == "true"
+    RELAY_BATCH_WINDOW_MS: float = float(os.getenv("RELAY_BATCH_WINDOW_MS", "1"))
+    RELAY_BATCH_MAX: int = int(os.getenv("RELAY_BATCH_MAX", "32"))
+    # Run asyncio on uvloop when it is installed (ignored on Windows)
+    USE_UVLOOP: bool = os.getenv("USE_UVLOOP", "true").lower() == "true"
     # Agent Configuration
     MAX_CONSECUTIVE_AUTO_REPLY: int = int(
         os.getenv("MAX_CONSECUTIVE_AUTO_REPLY", ""))
     WORK_DIR: str = os.getenv("WORK_DIR", "")
+    # Buffer STM writes in process and flush them in the background; reads are
+    # served from the buffer. Only safe when a user's requests reach one worker.
+    STM_WRITE_BEHIND: bool = os.getenv("STM_WRITE_BEHIND", "false").lower() == "true"
+    STM_FLUSH_INTERVAL_MS: float = float(os.getenv("STM_FLUSH_INTERVAL_MS", "500"))
+    # Split memory extraction into N concurrent calls over consecutive conversation slices (1 = single call)
+    MEMORY_EXTRACTION_SHARDS: int = int(os.getenv("MEMORY_EXTRACTION_SHARDS", "1"))
+    # Render the SystemAgent tool catalog as TSV instead of indented JSON
+    COMPACT_TOOL_CATALOG: bool = os.getenv("COMPACT_TOOL_CATALOG", "true").lower() == "true"
+
+    # Semantic response cache (skips MCPAgent LLM calls on paraphrased turns).
+    # Off by default: every turn pays an embedding call, so enable it once the
+    # hit rate has been measured to cover that cost.
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+    SEMANTIC_CACHE_MAX_ENTRIES: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1024"))
+    SEMANTIC_CACHE_DB_PATH: str = os.getenv("SEMANTIC_CACHE_DB_PATH", "")
+    # Recent turns folded into the cache key. The default of 1 (the previous
+    # assistant reply) keeps short follow-ups like "yes" or "and tomorrow?" from
+    # hitting replies cached under another conversation
+    SEMANTIC_CACHE_HISTORY_TURNS: int = int(os.getenv("SEMANTIC_CACHE_HISTORY_TURNS", "1"))
+    # Seconds a cached reply is served; prompts carry the current time, so
+    # answers go stale
+    SEMANTIC_CACHE_TTL: float = float(os.getenv("SEMANTIC_CACHE_TTL", "600"))
+
+    # Exact-match cache for deterministic (temperature 0) agent calls
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_TTL: float = float(os.getenv("LLM_CACHE_TTL", "3600"))
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+    # Shares the cache across workers; needs the "redis" extra (pip install .[redis])
+    LLM_CACHE_REDIS_URL: str = os.getenv("LLM_CACHE_REDIS_URL", "")
+
     @classmethod
     def validate(cls) -> bool:
         """Validate required configuration"""
@@ -40,7 +84,7 @@ class Config:
                 {
                     "model": "gpt-4o",
                     "api_version": "2024-12-01-preview",
-                    "temprature": 0,
+                    "temperature": 0,
                     "api_key": cls.OPENAI_API_KEY,
                     "azure_endpoint": cls.AZURE_OPENAI_ENDPOINT
                 },
@@ -51,7 +95,7 @@ class Config:
                 },
                 {
                     "model": "gpt-4o",
-                    "temprature": 1,
+                    "temperature": 1,
                     "api_version": "2024-12-01-preview",
                     "api_key": cls.OPENAI_API_KEY,
                     "azure_endpoint": cls.AZURE_OPENAI_ENDPOINT
@@ -60,7 +104,7 @@ class Config:
         }
 
     @staticmethod
-    def model_client(index: int = 0, json_output: bool = False, function_calling: bool = False, vision: bool = False, structured_output: bool = False):
+    def model_client(index: int = 0, json_output: bool = False, function_calling: bool = False, vision: bool = False, structured_output: bool = False, cache: bool = False):
         openai_cfg = Config.get_openai_config()
         # Wrap it into a proper model client object
         config = openai_cfg.get("config_list")[index]
@@ -85,6 +129,12 @@ class Config:
             client_kwargs["temperature"] = temperature
 
         model_client = AzureOpenAIChatCompletionClient(**client_kwargs)
+
+        # Serve identical deterministic calls from the exact-match cache
+        if cache and Config.LLM_CACHE_ENABLED and temperature == 0:
+            from brain_core.llm_cache import get_llm_cache
+            namespace = f"{config.get('model')}:{config.get('api_version')}"
+            model_client = ChatCompletionCache(model_client, get_llm_cache(namespace))
         return model_client
 
     @staticmethod
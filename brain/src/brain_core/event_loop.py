@@ -0,0 +1,28 @@
+"""
+Event loop factory that prefers uvloop (libuv) when it is installed.
+
+uvloop is not available on Windows, and it is skipped when ``Config.USE_UVLOOP``
+is disabled; both cases fall back to the default asyncio loop.
+"""
+import asyncio
+import sys
+
+from brain_core.config import Config
+
+try:
+    import uvloop
+except ImportError:  # pragma: no cover - uvloop is optional
+    uvloop = None
+
+
+def uvloop_enabled() -> bool:
+    """True when new loops will be uvloop loops."""
+    return uvloop is not None and Config.USE_UVLOOP and sys.platform != "win32"
+
+
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    """Create a new event loop, backed by uvloop when enabled."""
+    if uvloop_enabled():
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
@@ -0,0 +1,137 @@
+"""
+Exact-match prompt/response cache for deterministic (temperature 0) LLM calls.
+
+SystemAgent and MemoryAgent are effectively classifiers: identical prompts
+produce identical answers, so repeated calls are served from the cache
+instead of the model. The cache plugs into autogen's ChatCompletionCache,
+which hashes the messages, tools and output options of every `create` call.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Protocol
+
+from autogen_core import CacheStore
+from autogen_ext.models.cache import CHAT_CACHE_VALUE_TYPE
+from pydantic import TypeAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend(Protocol):
+    """Storage backend for cached LLM responses."""
+
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    def set(self, key: str, value: Any) -> None:
+        ...
+
+
+class MemoryBackend:
+    """In-process LRU backend with a per-entry TTL."""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+class RedisBackend:
+    """
+    Redis backend so the cache is shared across worker processes.
+
+    Values are stored as pydantic JSON, never pickled, so a shared Redis
+    can't feed arbitrary objects into the workers. Needs the ``redis`` extra.
+    """
+
+    # CreateResult, or the chunks and final CreateResult of a streamed call
+    _values = TypeAdapter(CHAT_CACHE_VALUE_TYPE)
+
+    def __init__(self, url: str, ttl: float = 3600.0, prefix: str = "aven:llm_cache:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = int(ttl)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(self.prefix + key)
+        return self._values.validate_json(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any) -> None:
+        self.client.set(self.prefix + key, self._values.dump_json(value), ex=self.ttl)
+
+
+class LLMCache(CacheStore[CHAT_CACHE_VALUE_TYPE]):
+    """
+    CacheStore adapter used by ChatCompletionCache.
+
+    Keys are namespaced by model so clients for different deployments never
+    share entries.
+    """
+
+    def __init__(self, backend: CacheBackend, namespace: str = ""):
+        self.backend = backend
+        self.namespace = namespace
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}" if self.namespace else key
+
+    def get(self, key: str, default: Optional[CHAT_CACHE_VALUE_TYPE] = None) -> Optional[CHAT_CACHE_VALUE_TYPE]:
+        try:
+            value = self.backend.get(self._key(key))
+        except Exception as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            return default
+        if value is None:
+            return default
+        logger.debug("LLM cache hit")
+        return value
+
+    def set(self, key: str, value: CHAT_CACHE_VALUE_TYPE) -> None:
+        try:
+            self.backend.set(self._key(key), value)
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+
+# Process-wide backend, created lazily on first use
+_backend: Optional[CacheBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_llm_cache(namespace: str = "") -> LLMCache:
+    """Get an LLMCache view over the shared backend."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                from brain_core.config import Config
+
+                if Config.LLM_CACHE_REDIS_URL:
+                    _backend = RedisBackend(Config.LLM_CACHE_REDIS_URL, ttl=Config.LLM_CACHE_TTL)
+                else:
+                    _backend = MemoryBackend(max_entries=Config.LLM_CACHE_MAX_ENTRIES, ttl=Config.LLM_CACHE_TTL)
+    return LLMCache(_backend, namespace=namespace)
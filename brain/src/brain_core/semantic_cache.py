@@ -0,0 +1,336 @@
+"""
+Semantic response cache for assistant turns.
+
+Paraphrased user messages ("what's on my calendar" / "do I have meetings today")
+asked against the same conversation context are answered from the cache instead
+of triggering a full MCPAgent LLM round-trip.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+import faiss
+import numpy as np
+from openai import AzureOpenAI
+
+from brain_core.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    """One cached assistant reply."""
+    query: str
+    response: str
+    context_hash: str
+    embedding: np.ndarray
+    ts: float
+    hits: int = 0
+
+
+def context_hash(*parts: str) -> str:
+    """Hash the conversation state (system context + recent turns) a reply depends on."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class SemanticCache:
+    """
+    In-memory FAISS (inner product over normalized embeddings) cache with LRU
+    eviction and optional SQLite persistence.
+
+    A lookup only hits when the cosine similarity is above ``threshold`` AND the
+    stored entry was produced under the same ``context_hash`` less than ``ttl``
+    seconds ago.
+    """
+
+    # Query embeddings kept from get() so the set() that follows a miss for the
+    # same query doesn't embed it again
+    RECENT_EMBEDDINGS = 64
+
+    def __init__(
+        self,
+        threshold: float = 0.92,
+        max_entries: int = 1024,
+        db_path: Optional[str] = None,
+        embed_fn: Optional[Callable[[str], Optional[np.ndarray]]] = None,
+        search_k: int = 8,
+        ttl: float = 600.0,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.search_k = search_k
+        self._embed_fn = embed_fn or self._azure_embedder()
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self._recent: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._index = None
+        self._next_id = 0
+
+        self._db = None
+        if db_path:
+            self._db = self._open_db(db_path)
+            self._load_from_db()
+
+    # ──────────────────────────────
+    # Public API
+    # ──────────────────────────────
+    def get(self, query: str, context_hash: str) -> Optional[str]:
+        """Return a cached response for a semantically similar query, or None."""
+        if not query or not self._entries:
+            return None
+
+        embedding = self._embed(query)
+        if embedding is None:
+            return None
+
+        with self._lock:
+            if self._index is None or self._index.ntotal == 0:
+                return None
+            k = min(self.search_k, self._index.ntotal)
+            scores, ids = self._index.search(embedding.reshape(1, -1), k)
+            expired = []
+            try:
+                for score, entry_id in zip(scores[0], ids[0]):
+                    if entry_id == -1 or score < self.threshold:
+                        break
+                    entry = self._entries.get(int(entry_id))
+                    if entry is None:
+                        continue
+                    if self._is_expired(entry):
+                        expired.append(int(entry_id))
+                        continue
+                    if entry.context_hash != context_hash:
+                        continue
+                    entry.hits += 1
+                    self._entries.move_to_end(int(entry_id))
+                    self._touch_db(int(entry_id), entry)
+                    logger.debug(f"Semantic cache hit (score={score:.3f}, hits={entry.hits})")
+                    return entry.response
+            finally:
+                self._remove(expired)
+        return None
+
+    def set(self, query: str, response: str, context_hash: str) -> None:
+        """Store a response for ``query`` under ``context_hash``."""
+        if not query or not response:
+            return
+
+        embedding = self._embed(query)
+        if embedding is None:
+            return
+
+        entry = CacheEntry(
+            query=query,
+            response=response,
+            context_hash=context_hash,
+            embedding=embedding,
+            ts=time.time(),
+        )
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._add(entry_id, entry)
+            self._insert_db(entry_id, entry)
+            self._evict()
+
+    def warmup(self) -> None:
+        """Open the embedding connection so the first real lookup skips its setup.
+
+        Uses the embedder's own ``warmup`` hook (a free request) when it has
+        one; never embeds, so worker starts don't make billable calls.
+        """
+        warmup = getattr(self._embed_fn, "warmup", None)
+        if warmup is not None:
+            warmup()
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+            self._recent.clear()
+            self._index = None
+            if self._db:
+                self._db.execute("DELETE FROM semantic_cache")
+                self._db.commit()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ──────────────────────────────
+    # Index helpers
+    # ──────────────────────────────
+    def _add(self, entry_id: int, entry: CacheEntry) -> None:
+        if self._index is None:
+            self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(entry.embedding.shape[0]))
+        self._index.add_with_ids(entry.embedding.reshape(1, -1), np.array([entry_id], dtype="int64"))
+        self._entries[entry_id] = entry
+
+    def _is_expired(self, entry: CacheEntry) -> bool:
+        # ts is when the reply was stored; hits don't extend it
+        return time.time() - entry.ts > self.ttl
+
+    def _remove(self, entry_ids: list) -> None:
+        if not entry_ids:
+            return
+        for entry_id in entry_ids:
+            self._entries.pop(entry_id, None)
+        self._index.remove_ids(np.array(entry_ids, dtype="int64"))
+        self._delete_db(entry_ids)
+
+    def _evict(self) -> None:
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            entry_id, _ = self._entries.popitem(last=False)
+            evicted.append(entry_id)
+        if evicted:
+            self._index.remove_ids(np.array(evicted, dtype="int64"))
+            self._delete_db(evicted)
+
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        with self._lock:
+            embedding = self._recent.get(text)
+            if embedding is not None:
+                self._recent.move_to_end(text)
+                return embedding
+        try:
+            embedding = self._embed_fn(text)
+        except Exception as e:
+            logger.warning(f"Semantic cache embedding failed: {e}")
+            return None
+        if embedding is None:
+            return None
+        embedding = np.asarray(embedding, dtype="float32").reshape(-1)
+        norm = np.linalg.norm(embedding)
+        if norm == 0:
+            return None
+        embedding = embedding / norm
+        with self._lock:
+            self._recent[text] = embedding
+            while len(self._recent) > self.RECENT_EMBEDDINGS:
+                self._recent.popitem(last=False)
+        return embedding
+
+    @staticmethod
+    def _azure_embedder() -> Callable[[str], Optional[np.ndarray]]:
+        """Embed with the same Azure OpenAI deployment used for long-term memory."""
+        client = None
+        model = Config.AZURE_OPENAI_EMBEDDING_DEPLOYMENT or "text-embedding-3-large"
+
+        def get_client() -> AzureOpenAI:
+            nonlocal client
+            if client is None:
+                client = AzureOpenAI(
+                    api_key=Config.OPENAI_API_KEY,
+                    api_version="2024-05-01-preview",
+                    azure_endpoint=Config.AZURE_OPENAI_ENDPOINT,
+                )
+            return client
+
+        def embed(text: str) -> Optional[np.ndarray]:
+            response = get_client().embeddings.create(model=model, input=text)
+            return np.array(response.data[0].embedding, dtype="float32")
+
+        def warmup() -> None:
+            # Listing models is free and leaves a pooled TLS connection behind
+            get_client().models.list()
+
+        embed.warmup = warmup
+        return embed
+
+    # ──────────────────────────────
+    # SQLite persistence
+    # ──────────────────────────────
+    @staticmethod
+    def _open_db(db_path: str) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        db = sqlite3.connect(db_path, check_same_thread=False)
+        db.execute("""
+            CREATE TABLE IF NOT EXISTS semantic_cache (
+                id INTEGER PRIMARY KEY,
+                query TEXT NOT NULL,
+                response TEXT NOT NULL,
+                context_hash TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                ts REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        db.commit()
+        return db
+
+    def _load_from_db(self) -> None:
+        rows = self._db.execute("""
+            SELECT id, query, response, context_hash, embedding, ts, hits
+            FROM semantic_cache WHERE ts > ? ORDER BY ts DESC LIMIT ?
+        """, (time.time() - self.ttl, self.max_entries)).fetchall()
+        for entry_id, query, response, ctx_hash, blob, ts, hits in reversed(rows):
+            entry = CacheEntry(
+                query=query,
+                response=response,
+                context_hash=ctx_hash,
+                embedding=np.frombuffer(blob, dtype="float32").copy(),
+                ts=ts,
+                hits=hits,
+            )
+            self._add(entry_id, entry)
+            self._next_id = max(self._next_id, entry_id + 1)
+        logger.debug(f"Loaded {len(rows)} semantic cache entries from disk")
+
+    def _insert_db(self, entry_id: int, entry: CacheEntry) -> None:
+        if not self._db:
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO semantic_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (entry_id, entry.query, entry.response, entry.context_hash,
+             entry.embedding.tobytes(), entry.ts, entry.hits),
+        )
+        self._db.commit()
+
+    def _touch_db(self, entry_id: int, entry: CacheEntry) -> None:
+        if not self._db:
+            return
+        self._db.execute(
+            "UPDATE semantic_cache SET hits = ? WHERE id = ?",
+            (entry.hits, entry_id),
+        )
+        self._db.commit()
+
+    def _delete_db(self, entry_ids: Iterable[int]) -> None:
+        if not self._db:
+            return
+        self._db.executemany("DELETE FROM semantic_cache WHERE id = ?", [(i,) for i in entry_ids])
+        self._db.commit()
+
+
+# Process-wide cache instance, created lazily on first use
+_semantic_cache: Optional[SemanticCache] = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Get the shared SemanticCache, or None when caching is disabled."""
+    global _semantic_cache
+    if not Config.SEMANTIC_CACHE_ENABLED:
+        return None
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticCache(
+                    threshold=Config.SEMANTIC_CACHE_THRESHOLD,
+                    max_entries=Config.SEMANTIC_CACHE_MAX_ENTRIES,
+                    db_path=Config.SEMANTIC_CACHE_DB_PATH or None,
+                    ttl=Config.SEMANTIC_CACHE_TTL,
+                )
+    return _semantic_cache
@@ -1,16 +1,75 @@
 """
 Function to send intent/action messages to devices via WebSocket relay server.
+
+Relay I/O runs on one long-lived event loop on its own thread, so the
+registered connection for each auth token stays open and is reused across
+chat requests (each of which runs on its own short-lived loop). A background
+dispatcher task reads every frame from the relay and resolves the waiting
+caller by ``request_id``.
+
+When ``Config.RELAY_BATCH_INTENTS`` is enabled, intents queued within
+``RELAY_BATCH_WINDOW_MS`` are coalesced into a single frame:
+
+    {"type": "batch", "messages": [<intent>, <intent>, ...]}
+
+The relay server must unpack batch frames and answer each intent with its own
+``response`` frame carrying the original ``request_id``.
+
+With ``Config.RELAY_BINARY_FRAMES`` intents are sent as binary frames of
+UTF-8 JSON, skipping the ``str`` encode/decode round-trip; incoming frames
+are decoded from either text or bytes.
+
+With ``Config.RELAY_V2`` the sender authenticates during the WebSocket
+handshake (``?device_id=...`` plus an ``Authorization: Bearer`` header) and
+skips the registration frame and its confirmation round-trip.
 """
 import asyncio
+import atexit
 import logging
+import random
+import threading
 import websockets
-import json
 import uuid
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from urllib.parse import urlencode
+from typing import Optional, Dict, Any, Tuple
 from brain_core.config import Config
+from brain_core.event_loop import new_event_loop
+from brain_core.fast_json import JSONDecodeError, dumps, dumps_bytes, loads
 
 logger = logging.getLogger(__name__)
 
+SENDER_ID = "system_sender"
+# Registration frame for unauthenticated senders never changes, so serialize it once
+_REGISTRATION_FRAME = dumps({"device_id": SENDER_ID})
+
+
+# Long-lived loop (on its own thread) that owns every relay connection,
+# created lazily on first use
+_relay_loop: Optional[asyncio.AbstractEventLoop] = None
+_relay_loop_lock = threading.Lock()
+
+
+def _get_relay_loop() -> asyncio.AbstractEventLoop:
+    """Get the shared loop that hosts relay connections."""
+    global _relay_loop
+    if _relay_loop is None:
+        with _relay_loop_lock:
+            if _relay_loop is None:
+                loop = new_event_loop()
+                threading.Thread(target=loop.run_forever, name="relay-loop", daemon=True).start()
+                atexit.register(_close_relay_connections)
+                _relay_loop = loop
+    return _relay_loop
+
+
+def _close_relay_connections() -> None:
+    """Close every relay connection cleanly at interpreter exit."""
+    try:
+        asyncio.run_coroutine_threadsafe(_RelayConnection.close_all(), _relay_loop).result(timeout=5.0)
+    except Exception as e:
+        logger.debug(f"Error closing relay connections: {e}")
+
 
 def _is_connection_open(ws) -> bool:
     """Check if WebSocket connection is open (works for both client and server)."""
@@ -25,6 +84,252 @@ def _is_connection_open(ws) -> bool:
     return True
 
 
+def _relay_error(error_msg: str, error_code: int) -> ConnectionError:
+    """Map a relay server error frame to the exception raised to the caller."""
+    if error_code == 404 and "not connected" in error_msg.lower():
+        return ConnectionError(f"Device not connected: {error_msg}")
+    return ConnectionError(f"Relay server error: {error_msg}")
+
+
+def _backoff_delay(attempt: int, base_delay: float, factor: float, cap: float) -> float:
+    """Truncated exponential backoff with full jitter: uniform(0, min(cap, base * factor**attempt))."""
+    return random.uniform(0, min(cap, base_delay * factor ** attempt))
+
+
+class _RelayConnection:
+    """
+    Registered sender connection to the relay server, shared by every intent
+    sent with the same auth token. Only used from the relay loop.
+    """
+
+    # Open connections, least recently used first; the oldest are closed past MAX_CONNECTIONS
+    MAX_CONNECTIONS = 64
+    _connections: "OrderedDict[Tuple[str, Optional[str]], _RelayConnection]" = OrderedDict()
+    _lock: Optional[asyncio.Lock] = None
+
+    def __init__(self, ws):
+        self.ws = ws
+        # bytes are sent as binary frames, str as text frames
+        self._encode = dumps_bytes if Config.RELAY_BINARY_FRAMES else dumps
+        self.futures: Dict[str, asyncio.Future] = {}
+        loop = asyncio.get_running_loop()
+        self._dispatcher = loop.create_task(self._dispatch())
+        self._send_queue: "asyncio.Queue[Tuple[Dict[str, Any], asyncio.Future]]" = asyncio.Queue()
+        self._flusher = loop.create_task(self._flush()) if Config.RELAY_BATCH_INTENTS else None
+
+    @property
+    def is_open(self) -> bool:
+        return _is_connection_open(self.ws) and not self._dispatcher.done()
+
+    @classmethod
+    async def get(cls, relay_url: str, auth_token: Optional[str] = None) -> "_RelayConnection":
+        """Return the open connection for this token, connecting on first use."""
+        if cls._lock is None:
+            # Created on the relay loop itself, the only loop that awaits it
+            cls._lock = asyncio.Lock()
+
+        async with cls._lock:
+            key = (relay_url, auth_token)
+            conn = cls._connections.get(key)
+            if conn is None or not conn.is_open:
+                conn = await cls._connect(relay_url, auth_token)
+                cls._connections[key] = conn
+            cls._connections.move_to_end(key)
+            while len(cls._connections) > cls.MAX_CONNECTIONS:
+                _, stale = cls._connections.popitem(last=False)
+                asyncio.create_task(stale.close())
+            return conn
+
+    @classmethod
+    async def close_all(cls) -> None:
+        """Close every pooled connection."""
+        connections, cls._connections = list(cls._connections.values()), OrderedDict()
+        await asyncio.gather(*(conn.close() for conn in connections), return_exceptions=True)
+
+    @classmethod
+    async def _connect(cls, relay_url: str, auth_token: Optional[str]) -> "_RelayConnection":
+        """Open and register a new sender connection."""
+        if Config.RELAY_V2:
+            # The server authenticates the handshake: device_id in the query,
+            # the token in an Authorization header (kept out of proxy/access logs)
+            separator = "&" if "?" in relay_url else "?"
+            headers = {"Authorization": f"Bearer {auth_token}"} if auth_token else None
+            ws = await websockets.connect(
+                f"{relay_url}{separator}{urlencode({'device_id': SENDER_ID})}",
+                extra_headers=headers,
+                ping_interval=20,
+                close_timeout=5.0
+            )
+            logger.debug(f"Successfully connected to relay server as {SENDER_ID} (handshake auth)")
+            return cls(ws)
+
+        ws = await websockets.connect(
+            relay_url,
+            ping_interval=20,
+            close_timeout=5.0
+        )
+        try:
+            # Register as sender
+            if auth_token:
+                await ws.send(dumps({"device_id": SENDER_ID, "token": auth_token}))
+            else:
+                await ws.send(_REGISTRATION_FRAME)
+
+            # Wait for connection confirmation
+            async with asyncio.timeout(5.0):
+                confirmation = await ws.recv()
+            conf_data = loads(confirmation)
+            if conf_data.get("type") != "connected":
+                logger.error(f"Failed to connect to relay server: {conf_data}")
+                raise ConnectionError("Failed to connect to relay server")
+        except BaseException:
+            await ws.close()
+            raise
+
+        logger.debug(f"Successfully connected to relay server as {SENDER_ID}")
+        return cls(ws)
+
+    async def _dispatch(self) -> None:
+        """
+        Read relay frames and resolve the future waiting on each request_id.
+
+        This is the only reader on the socket, so any number of intents can be
+        in flight. Error frames without a request_id can only be routed when a
+        single intent is waiting; otherwise they are dropped and the waiters
+        time out, so the relay should echo request_id on every error.
+        """
+        try:
+            async for raw in self.ws:
+                try:
+                    response_data = loads(raw)
+                except JSONDecodeError:
+                    logger.debug("Ignoring non-JSON frame from relay server")
+                    continue
+
+                msg_type = response_data.get("type")
+
+                # Handle pong messages (server ping responses)
+                if msg_type == "pong" or response_data.get("action") == "pong":
+                    logger.debug("Received pong from server")
+                    continue
+
+                # Ignore server control messages
+                if msg_type in ["connected", "server_status"]:
+                    logger.debug(f"Ignoring server message: {msg_type}")
+                    continue
+
+                request_id = response_data.get("request_id")
+                if msg_type == "error" and not request_id:
+                    if len(self.futures) != 1:
+                        # The socket is shared, so the error may come from a
+                        # fire-and-forget or any other in-flight intent
+                        logger.warning(f"Dropping relay error without request_id: {response_data.get('error')}")
+                        continue
+                    # Only one intent is waiting on this connection
+                    request_id = next(iter(self.futures))
+
+                future = self.futures.pop(request_id, None) if request_id else None
+                if future is None or future.done():
+                    logger.debug(f"Received unexpected message type: {msg_type}")
+                    continue
+
+                if msg_type == "error":
+                    error_msg = response_data.get("error", "Unknown error")
+                    error_code = response_data.get("code", 500)
+                    logger.error(f"Received error from relay server: {error_msg} (code: {error_code})")
+                    future.set_exception(_relay_error(error_msg, error_code))
+                elif msg_type == "response":
+                    future.set_result(response_data.get("data"))
+                else:
+                    logger.debug(f"Received unexpected message type: {msg_type}")
+                    self.futures[request_id] = future
+        except websockets.exceptions.ConnectionClosed as e:
+            logger.debug(f"Relay connection closed: {e}")
+            self._fail_pending(e)
+        except Exception as e:
+            logger.error(f"Relay dispatcher failed: {e}", exc_info=True)
+            self._fail_pending(ConnectionError(f"Relay dispatcher failed: {e}"))
+        else:
+            self._fail_pending(ConnectionError("Relay connection closed"))
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        """Send one intent, coalescing it with concurrent intents when batching is enabled."""
+        if self._flusher is None:
+            await self.ws.send(self._encode(message))
+            return
+        if self._flusher.done():
+            raise ConnectionError("Relay connection closed")
+
+        sent = asyncio.get_running_loop().create_future()
+        await self._send_queue.put((message, sent))
+        await sent
+
+    async def _flush(self) -> None:
+        """Drain the send queue in short windows and write each window as one frame."""
+        window = Config.RELAY_BATCH_WINDOW_MS / 1000.0
+        batch = []
+        try:
+            while True:
+                batch = [await self._send_queue.get()]
+                await asyncio.sleep(window)
+                while len(batch) < Config.RELAY_BATCH_MAX:
+                    try:
+                        batch.append(self._send_queue.get_nowait())
+                    except asyncio.QueueEmpty:
+                        break
+
+                messages = [message for message, _ in batch]
+                try:
+                    if len(messages) == 1:
+                        await self.ws.send(self._encode(messages[0]))
+                    else:
+                        await self.ws.send(self._encode({"type": "batch", "messages": messages}))
+                        logger.debug(f"Sent {len(messages)} intents in one batch frame")
+                except Exception as e:
+                    self._fail_batch(batch, e)
+                    batch = []
+                    continue
+
+                for _, sent in batch:
+                    if not sent.done():
+                        sent.set_result(None)
+                batch = []
+        except asyncio.CancelledError:
+            # Cancelled mid-window or mid-send: the intents already taken off the
+            # queue would otherwise leave their senders waiting forever
+            self._fail_batch(batch, ConnectionError("Relay connection closed"))
+            raise
+
+    @staticmethod
+    def _fail_batch(batch, exc: BaseException) -> None:
+        for _, sent in batch:
+            if not sent.done():
+                sent.set_exception(exc)
+
+    def _fail_pending(self, exc: BaseException) -> None:
+        """Fail every in-flight request so callers can retry on a fresh connection."""
+        futures, self.futures = self.futures, {}
+        for future in futures.values():
+            if not future.done():
+                future.set_exception(exc)
+
+        if self._flusher is not None:
+            self._flusher.cancel()
+            while not self._send_queue.empty():
+                self._fail_batch([self._send_queue.get_nowait()], exc)
+
+    async def close(self) -> None:
+        """Close the connection and stop the background tasks."""
+        self._dispatcher.cancel()
+        if self._flusher is not None:
+            self._flusher.cancel()
+        if _is_connection_open(self.ws):
+            try:
+                await self.ws.close()
+            except Exception as e:
+                logger.debug(f"Error closing connection: {e}")
+
+
 async def send_intent(
     device_id: str,
     action: str,
@@ -34,7 +339,9 @@ async def send_intent(
     auth_token: Optional[str] = None,
     retry_on_not_connected: bool = True,
     max_retries: int = 3,
-    retry_delay: float = 1.0
+    retry_delay: float = 1.0,
+    backoff_base: float = 2.0,
+    backoff_cap: float = 30.0
 ) -> Optional[Dict[str, Any]]:
     """
     Send an intent/action message to a target device via the relay server.
@@ -48,7 +355,10 @@ async def send_intent(
         auth_token: Optional Supabase authentication token for relay server auth
         retry_on_not_connected: If True, retry if device is not connected (default: True)
         max_retries: Maximum number of retries if device not connected (default: 3)
-        retry_delay: Delay between retries in seconds (default: 1.0)
+        retry_delay: Initial retry delay in seconds; later retries back off
+            exponentially with full jitter (default: 1.0)
+        backoff_base: Growth factor of the retry delay per attempt (default: 2.0)
+        backoff_cap: Upper bound of the retry delay in seconds (default: 30.0)
     
     Returns:
         Optional[Dict]: Response from the device if wait_for_response=True, None otherwise
@@ -57,138 +367,91 @@ async def send_intent(
         ConnectionError: If relay server is unavailable or device is not connected
         TimeoutError: If response timeout exceeded
     """
+    coro = _send_intent(
+        device_id, action, data, wait_for_response, timeout, auth_token,
+        retry_on_not_connected, max_retries, retry_delay, backoff_base, backoff_cap
+    )
+    loop = _get_relay_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    # Cancelling the caller cancels the intent on the relay loop as well
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+async def _send_intent(
+    device_id: str,
+    action: str,
+    data: Optional[Dict[str, Any]],
+    wait_for_response: bool,
+    timeout: float,
+    auth_token: Optional[str],
+    retry_on_not_connected: bool,
+    max_retries: int,
+    retry_delay: float,
+    backoff_base: float,
+    backoff_cap: float
+) -> Optional[Dict[str, Any]]:
+    """Body of send_intent; runs on the relay loop."""
     relay_url = Config.RELAY_SERVER_URL
-    sender_id = "system_sender"
     
     logger.debug(f"Sending intent to device {device_id} with action '{action}' via relay: {relay_url}")
     
-    ws = None
-    
     for attempt in range(max_retries + 1):
+        request_id = str(uuid.uuid4())
+        conn = None
         try:
-            # Connect to relay server
-            ws = await websockets.connect(
-                relay_url,
-                ping_interval=None,
-                close_timeout=5.0
-            )
-            
+            # Reuse the registered relay connection for this token
+            conn = await _RelayConnection.get(relay_url, auth_token)
+
+            # Prepare message
+            message = {
+                "target_id": device_id,
+                "action": action,
+                "request_id": request_id,
+                "type": "intent",
+                "data": data or {}
+            }
+
+            future = None
+            if wait_for_response:
+                future = asyncio.get_running_loop().create_future()
+                conn.futures[request_id] = future
+
+            # Send message
+            await conn.send(message)
+            logger.debug(f"Sent intent message to device {device_id}, request_id: {request_id}, wait_for_response: {wait_for_response}")
+
+            # If not waiting for response, return immediately
+            if future is None:
+                return None
+
+            # Wait for the dispatcher to route the response to us
             try:
-                # Register as sender
-                registration = {"device_id": sender_id}
-                if auth_token:
-                    registration["token"] = auth_token
-                await ws.send(json.dumps(registration))
-                
-                # Wait for connection confirmation
-                confirmation = await asyncio.wait_for(ws.recv(), timeout=5.0)
-                conf_data = json.loads(confirmation)
-                if conf_data.get("type") != "connected":
-                    logger.error(f"Failed to connect to relay server: {conf_data}")
-                    raise ConnectionError("Failed to connect to relay server")
-                
-                logger.debug(f"Successfully connected to relay server as {sender_id}")
-                
-                # Prepare message
-                request_id = str(uuid.uuid4())
-                message = {
-                    "target_id": device_id,
-                    "action": action,
-                    "request_id": request_id,
-                    "type": "intent",
-                    "data": data or {}
-                }
-                
-                # Send message
-                await ws.send(json.dumps(message))
-                logger.debug(f"Sent intent message to device {device_id}, request_id: {request_id}, wait_for_response: {wait_for_response}")
-                
-                # If not waiting for response, return immediately
-                if not wait_for_response:
-                    return None
-                
-                # Wait for response with timeout
-                start_time = asyncio.get_event_loop().time()
-                
-                while True:
-                    elapsed = asyncio.get_event_loop().time() - start_time
-                    remaining = timeout - elapsed
-                    
-                    if remaining <= 0:
-                        logger.warning(f"No response from device {device_id} within {timeout}s")
-                        raise TimeoutError(f"No response from {device_id} within {timeout}s")
-                    
-                    try:
-                        # Wait for message with remaining timeout
-                        response_msg = await asyncio.wait_for(ws.recv(), timeout=min(remaining, 5.0))
-                        response_data = json.loads(response_msg)
-                        
-                        # Handle pong messages (server ping responses)
-                        if response_data.get("type") == "pong" or response_data.get("action") == "pong":
-                            logger.debug("Received pong from server")
-                            continue
-                        
-                        # Ignore server control messages
-                        if response_data.get("type") in ["connected", "server_status"]:
-                            logger.debug(f"Ignoring server message: {response_data.get('type')}")
-                            continue
-                        
-                        # Handle error messages
-                        if response_data.get("type") == "error":
-                            error_msg = response_data.get("error", "Unknown error")
-                            error_code = response_data.get("code", 500)
-                            
-                            # If device not connected (404), this is retryable
-                            if error_code == 404 and "not connected" in error_msg.lower():
-                                if retry_on_not_connected and attempt < max_retries:
-                                    logger.warning(f"Device not connected (attempt {attempt + 1}/{max_retries + 1}), retrying...")
-                                    raise ConnectionError(f"Device not connected: {error_msg}")
-                                else:
-                                    raise ConnectionError(f"Device {device_id} is not connected: {error_msg}")
-                            
-                            # Other errors - don't retry
-                            logger.error(f"Received error from relay server: {error_msg} (code: {error_code})")
-                            raise ConnectionError(f"Relay server error: {error_msg}")
-                        
-                        # Check if this is the response to our request
-                        if (response_data.get("type") == "response" and 
-                            response_data.get("request_id") == request_id):
-                            logger.debug(f"Received response from device {device_id}")
-                            return response_data.get("data")
-                        
-                        logger.debug(f"Received unexpected message type: {response_data.get('type')}")
-                        
-                    except asyncio.TimeoutError:
-                        elapsed = asyncio.get_event_loop().time() - start_time
-                        if elapsed >= timeout:
-                            raise TimeoutError(f"No response from {device_id} within {timeout}s")
-                        continue
-                
-            finally:
-                # Close connection when done
-                if _is_connection_open(ws):
-                    try:
-                        await ws.close()
-                    except Exception as e:
-                        logger.debug(f"Error closing connection: {e}")
-            
-            # Success - exit retry loop
-            return None
+                async with asyncio.timeout(timeout):
+                    response = await future
+            except asyncio.TimeoutError:
+                logger.warning(f"No response from device {device_id} within {timeout}s")
+                raise TimeoutError(f"No response from {device_id} within {timeout}s")
+            logger.debug(f"Received response from device {device_id}")
+            return response
                 
         except ConnectionError as e:
             # Retry on "not connected" errors
             if "not connected" in str(e).lower() and retry_on_not_connected and attempt < max_retries:
-                logger.warning(f"Device not connected (attempt {attempt + 1}/{max_retries + 1}), retrying in {retry_delay}s...")
-                await asyncio.sleep(retry_delay)
+                delay = _backoff_delay(attempt, retry_delay, backoff_base, backoff_cap)
+                logger.warning(f"Device not connected (attempt {attempt + 1}/{max_retries + 1}), retrying in {delay:.2f}s...")
+                await asyncio.sleep(delay)
                 continue
             # Other connection errors or exhausted retries - raise
             raise
             
         except (websockets.exceptions.ConnectionClosed, websockets.exceptions.InvalidStatusCode) as e:
-            # Network/protocol errors - retry if we have attempts left
+            # Network/protocol errors - the dispatcher drops the dead connection,
+            # so the next attempt reconnects
             if attempt < max_retries:
-                logger.warning(f"Network error (attempt {attempt + 1}/{max_retries + 1}), retrying in {retry_delay}s...")
-                await asyncio.sleep(retry_delay)
+                delay = _backoff_delay(attempt, retry_delay, backoff_base, backoff_cap)
+                logger.warning(f"Network error (attempt {attempt + 1}/{max_retries + 1}), retrying in {delay:.2f}s...")
+                await asyncio.sleep(delay)
                 continue
             # Exhausted retries
             raise ConnectionError(f"Failed to connect to relay server: {e}")
@@ -200,14 +463,11 @@ async def send_intent(
         except Exception as e:
             logger.error(f"Unexpected error sending intent to {device_id}: {e}", exc_info=True)
             raise ConnectionError(f"Failed to send intent: {str(e)}")
-            
+
         finally:
-            # Ensure connection is closed on any exception
-            if ws and _is_connection_open(ws):
-                try:
-                    await ws.close()
-                except Exception:
-                    pass
+            # Stop routing responses for this attempt
+            if conn is not None:
+                conn.futures.pop(request_id, None)
     
     # Should not reach here, but failsafe
-    raise ConnectionError(f"Failed to send intent to device {device_id} after {max_retries + 1} attempts")
\ No newline at end of file
+    raise ConnectionError(f"Failed to send intent to device {device_id} after {max_retries + 1} attempts")
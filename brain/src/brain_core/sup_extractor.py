@@ -9,12 +9,22 @@ used across the application, including:
 - Authentication
 """
 import os
+import asyncio
+import base64
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
 from datetime import datetime
-from supabase import create_client, Client
 from dotenv import load_dotenv
 
+from brain_core.fast_json import loads
+
+if TYPE_CHECKING:
+    from supabase import Client
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -24,7 +34,24 @@ class SupabaseService:
     """Centralized Supabase service for all database operations."""
     
     _instance: Optional['SupabaseService'] = None
-    _client: Optional[Client] = None
+    _client: Optional["Client"] = None
+    _client_lock = threading.Lock()
+    # Cleared once PostgREST reports the recent_messages RPC isn't deployed
+    _recent_messages_rpc = True
+    # Cleared if user_tags lacks the UNIQUE (user_id, tag) constraint the upsert needs
+    _tags_upsert = True
+    
+    # Verified tokens: blake2b(token) -> (expires_at, user_data), LRU ordered
+    _token_cache: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+    _token_lock = threading.Lock()
+    TOKEN_CACHE_MAX = 1024
+    TOKEN_CACHE_TTL = 300.0
+    
+    # Active agents per user: user_id -> (expires_at, agents), LRU ordered
+    _agents_cache: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+    _agents_lock = threading.Lock()
+    AGENTS_CACHE_MAX = 1024
+    AGENTS_CACHE_TTL = 30.0
     
     def __new__(cls):
         """Singleton pattern to ensure only one instance exists."""
@@ -32,13 +59,11 @@ class SupabaseService:
             cls._instance = super(SupabaseService, cls).__new__(cls)
         return cls._instance
     
-    def __init__(self):
-        """Initialize Supabase client if not already initialized."""
-        if self._client is None:
-            self._client = self._init_client()
-    
-    def _init_client(self) -> Client:
+    def _init_client(self) -> "Client":
         """Initialize Supabase client with service role key (bypasses RLS)."""
+        # Imported here so importing this module doesn't load the supabase stack
+        from supabase import create_client
+        
         supabase_url = os.getenv("SUPABASE_URL")
         # Prefer service role key for server-side operations (bypasses RLS)
         service_role_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
@@ -56,10 +81,12 @@ class SupabaseService:
         return create_client(supabase_url, supabase_key)
     
     @property
-    def client(self) -> Client:
-        """Get the Supabase client."""
+    def client(self) -> "Client":
+        """Get the Supabase client, creating it on first use."""
         if self._client is None:
-            self._client = self._init_client()
+            with self._client_lock:
+                if self._client is None:
+                    SupabaseService._client = self._init_client()
         return self._client
     
     # ============================================================================
@@ -67,17 +94,20 @@ class SupabaseService:
     # ============================================================================
     
     def save_messages(self, user_id: str, messages: List[Dict[str, Any]], table_name: str = "conversation_history"):
-        """Save chat messages to Supabase safely."""
+        """Save chat messages to Supabase safely (one bulk insert per call)."""
         if not messages:
             return
         try:
+            rows = []
             for message in messages:
-                # Prepare message data
+                # Prepare message data; "name" is only stored when present
                 message_data = {
                     "role": message.get("role"),
-                    "content": message.get("content"),
-                    "name": message.get("name")
+                    "content": message.get("content")
                 }
+                name = message.get("name")
+                if name:
+                    message_data["name"] = name
                 
                 # Prepare insert data
                 insert_data = {
@@ -95,42 +125,82 @@ class SupabaseService:
                         # Already a string, use as-is
                         insert_data["timestamp"] = timestamp
                 # If timestamp is None, let Supabase use DEFAULT CURRENT_TIMESTAMP
-                
-                # Insert into Supabase
-                self.client.table(table_name).insert(insert_data).execute()
+                rows.append(insert_data)
+            
+            # Insert every row in a single request
+            self.client.table(table_name).insert(rows).execute()
         except Exception as e:
             logger.error(f"Error saving messages to Supabase for user {user_id}: {e}", exc_info=True)
     
     def get_messages(self, user_id: str, limit: int = 100, table_name: str = "conversation_history") -> List[Dict[str, Any]]:
-        """Get messages from Supabase"""
+        """Get the latest ``limit`` messages from Supabase, oldest first"""
         try:
-            # Query Supabase table
-            response = self.client.table(table_name)\
-                .select("message_data, timestamp")\
-                .eq("user_id", user_id)\
-                .order("timestamp", desc=True)\
-                .limit(limit)\
-                .execute()
+            rows = self._recent_message_rows(user_id, limit, table_name)
             
-            # Convert response to list of messages
+            # Convert response to list of messages; each decoded message_data
+            # dict belongs to this call, so the timestamp is set in place
             messages = []
-            for row in response.data:
-                message_data = row.get("message_data", {})
-                timestamp = row.get("timestamp")
-                
-                # Combine message_data with timestamp
-                message = {
-                    **message_data,
-                    "timestamp": timestamp
-                }
+            for row in rows:
+                message = row.get("message_data") or {}
+                message["timestamp"] = row.get("timestamp")
                 messages.append(message)
-            
-            # Reverse to get chronological order (oldest first)
-            return messages[::-1]
+            return messages
         except Exception as e:
             logger.error(f"Error getting messages from Supabase for user {user_id}: {e}", exc_info=True)
             return []
     
+    def _recent_message_rows(self, user_id: str, limit: int, table_name: str) -> List[Dict[str, Any]]:
+        """
+        Fetch the latest ``limit`` rows in chronological order.
+        
+        Uses the ``recent_messages`` RPC, which windows and re-orders on the
+        server, when it is deployed:
+        
+            CREATE FUNCTION recent_messages(uid uuid, lim int)
+            RETURNS SETOF conversation_history LANGUAGE sql STABLE AS $$
+                SELECT * FROM (
+                    SELECT * FROM conversation_history
+                    WHERE user_id = uid ORDER BY timestamp DESC LIMIT lim
+                ) t ORDER BY timestamp ASC
+            $$;
+        
+        Falls back to a DESC query reversed in Python if the RPC fails, and
+        stops trying it once PostgREST reports that it doesn't exist.
+        """
+        if table_name == "conversation_history" and SupabaseService._recent_messages_rpc:
+            try:
+                return self.client.rpc("recent_messages", {"uid": user_id, "lim": limit}).execute().data
+            except Exception as e:
+                # PGRST202: function not in the schema cache; 42883: undefined function
+                error = str(getattr(e, "code", "")) + str(e)
+                if "PGRST202" in error or "42883" in error:
+                    logger.warning(f"recent_messages RPC not deployed, using table query from now on: {e}")
+                    SupabaseService._recent_messages_rpc = False
+                else:
+                    logger.warning(f"recent_messages RPC failed, falling back to table query: {e}")
+        
+        response = self.client.table(table_name)\
+            .select("message_data, timestamp")\
+            .eq("user_id", user_id)\
+            .order("timestamp", desc=True)\
+            .limit(limit)\
+            .execute()
+        rows = response.data
+        rows.reverse()
+        return rows
+    
+    def count_messages(self, user_id: str, table_name: str = "conversation_history") -> int:
+        """Count a user's stored messages without fetching them"""
+        try:
+            response = self.client.table(table_name)\
+                .select("*", count="exact", head=True)\
+                .eq("user_id", user_id)\
+                .execute()
+            return response.count or 0
+        except Exception as e:
+            logger.error(f"Error counting messages in Supabase for user {user_id}: {e}", exc_info=True)
+            return 0
+    
     def clear_messages(self, user_id: str, table_name: str = "conversation_history"):
         """Clear messages for a user"""
         try:
@@ -147,26 +217,53 @@ class SupabaseService:
     # ============================================================================
     
     def save_tag(self, user_id: str, tag: str, table_name: str = "user_tags"):
-        """Save a tag for this user"""
+        """Save a tag for this user (no-op if it already exists)"""
         if not tag:
             return
+        self.save_tags(user_id, [tag], table_name)
+    
+    def save_tags(self, user_id: str, tags: List[str], table_name: str = "user_tags"):
+        """
+        Save multiple tags for this user in one upsert.
+        
+        Existing tags are skipped by the database instead of a SELECT
+        beforehand, which needs a unique constraint on the table:
         
-        # Check if tag already exists
-        if self.tag_exists(user_id, tag, table_name):
+            ALTER TABLE user_tags
+                ADD CONSTRAINT user_tags_user_id_tag_key UNIQUE (user_id, tag);
+        
+        Falls back to reading the existing tags and inserting the missing ones
+        if the constraint is missing.
+        """
+        # Deduplicate while keeping order
+        tags = list(dict.fromkeys(tag for tag in tags if tag))
+        if not tags:
             return
         
         try:
-            self.client.table(table_name).insert({
-                "user_id": user_id,
-                "tag": tag
-            }).execute()
+            if SupabaseService._tags_upsert:
+                try:
+                    self.client.table(table_name).upsert(
+                        [{"user_id": user_id, "tag": tag} for tag in tags],
+                        on_conflict="user_id,tag",
+                        ignore_duplicates=True
+                    ).execute()
+                    return
+                except Exception as e:
+                    # 42P10: no unique or exclusion constraint matching ON CONFLICT
+                    if "42P10" not in str(getattr(e, "code", "")) + str(e):
+                        raise
+                    logger.warning(f"user_tags has no UNIQUE (user_id, tag) constraint, falling back to insert: {e}")
+                    SupabaseService._tags_upsert = False
+            
+            existing = set(self.get_tags(user_id, table_name))
+            missing = [tag for tag in tags if tag not in existing]
+            if missing:
+                self.client.table(table_name).insert(
+                    [{"user_id": user_id, "tag": tag} for tag in missing]
+                ).execute()
         except Exception as e:
-            logger.error(f"Error saving tag '{tag}' to Supabase for user {user_id}: {e}", exc_info=True)
-    
-    def save_tags(self, user_id: str, tags: List[str], table_name: str = "user_tags"):
-        """Save multiple tags for this user"""
-        for tag in tags:
-            self.save_tag(user_id, tag, table_name)
+            logger.error(f"Error saving tags to Supabase for user {user_id}: {e}", exc_info=True)
     
     def get_tags(self, user_id: str, table_name: str = "user_tags") -> List[str]:
         """Get all unique tags for this user"""
@@ -177,14 +274,9 @@ class SupabaseService:
                 .order("tag")\
                 .execute()
             
-            # Extract unique tags
-            tags = set()
-            for row in response.data:
-                tag = row.get("tag")
-                if tag:
-                    tags.add(tag)
-            
-            return sorted(list(tags))
+            # Rows are unique per (user_id, tag) and already sorted by the server;
+            # dict.fromkeys only guards against legacy duplicates without re-sorting
+            return list(dict.fromkeys(row["tag"] for row in response.data if row.get("tag")))
         except Exception as e:
             logger.error(f"Error getting tags from Supabase for user {user_id}: {e}", exc_info=True)
             return []
@@ -222,47 +314,57 @@ class SupabaseService:
     def get_user_active_agents(self, user_id: str) -> List[Dict[str, Any]]:
         """Fetch all active agents for a user from Supabase.
         
+        Results are cached per user for AGENTS_CACHE_TTL seconds. Installs
+        and uninstalls happen outside this service, so they only become
+        visible once the cached entry expires.
+        
         Args:
             user_id: The user ID to fetch agents for
         """
+        with self._agents_lock:
+            cached = self._agents_cache.get(user_id)
+            if cached:
+                if cached[0] > time.monotonic():
+                    self._agents_cache.move_to_end(user_id)
+                    return list(cached[1])
+                del self._agents_cache[user_id]
+        
         try:
             # Use the default client which already uses service role key
-            # This bypasses RLS for all operations
-            client = self.client
-            
-            # Get active installed agents for the user
-            installed_response = client.table("installed_agents").select(
-                "id, agent_id, is_active"
+            # This bypasses RLS for all operations.
+            # The agents row is embedded through the agent_id foreign key, so
+            # installed agents and their details come back in one request.
+            response = self.client.table("installed_agents").select(
+                "id, agent_id, is_active, agents(id, name, is_offline, access_url)"
             ).eq("user_id", user_id).eq("is_active", True).execute()
             
-            if not installed_response.data:
+            if not response.data:
                 logger.debug(f"No active agents found for user: {user_id}")
                 return []
             
-            # Extract agent_ids
-            agent_ids = [str(row["agent_id"]) for row in installed_response.data]
-            installed_agent_map = {str(row["agent_id"]): str(row["id"]) for row in installed_response.data}
-
-            # Query agents table to get full details including access_url
-            agents_response = self.client.table("agents").select(
-                "id, name, is_offline, access_url"
-            ).in_("id", agent_ids).execute()
-            
-            # Build agent list
-            agents = []
-            for agent_row in agents_response.data:
+            # Build agent list, one entry per agent
+            agents_by_id: Dict[str, Dict[str, Any]] = {}
+            for row in response.data:
+                agent_row = row.get("agents")
+                if not agent_row:
+                    continue
                 agent_id = str(agent_row["id"])
-                agent_info = {
+                agents_by_id[agent_id] = {
                     "id": agent_id,  # Use agent_id as the tool ID
                     "name": agent_row.get("name", "Unknown Agent"),
                     "local": agent_row.get("is_offline", False),  # is_offline determines if local
                     "access_url": agent_row.get("access_url", ""),
-                    "installed_agent_id": installed_agent_map.get(agent_id, "")  # Keep installed_agents.id for reference
+                    "installed_agent_id": str(row["id"])  # Keep installed_agents.id for reference
                 }
-                agents.append(agent_info)
+            agents = list(agents_by_id.values())
             
             logger.debug(f"Loaded {len(agents)} active agent(s) for user: {user_id}")
-            return agents
+            with self._agents_lock:
+                self._agents_cache[user_id] = (time.monotonic() + self.AGENTS_CACHE_TTL, agents)
+                self._agents_cache.move_to_end(user_id)
+                while len(self._agents_cache) > self.AGENTS_CACHE_MAX:
+                    self._agents_cache.popitem(last=False)
+            return list(agents)
         
         except Exception as e:
             logger.error(f"Error fetching user agents from Supabase for user {user_id}: {e}", exc_info=True)
@@ -286,12 +388,27 @@ class SupabaseService:
         """
         Verify JWT token with Supabase and return user details
         
+        Verified tokens are cached in-process until the earlier of the JWT's
+        ``exp`` claim and TOKEN_CACHE_TTL, so repeat requests skip the auth RPC.
+        
         Args:
             token: JWT token string
             
         Returns:
             dict: User details if token is valid, None otherwise
         """
+        if not token:
+            return None
+        
+        key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        with self._token_lock:
+            cached = self._token_cache.get(key)
+            if cached:
+                if cached[0] > time.time():
+                    self._token_cache.move_to_end(key)
+                    return cached[1]
+                del self._token_cache[key]
+        
         try:
             # Set the auth token and get user details
             # The get_user method verifies the token automatically
@@ -306,14 +423,45 @@ class SupabaseService:
                     "user_metadata": response.user.user_metadata or {},
                     "app_metadata": response.user.app_metadata or {}
                 }
+                self._cache_token(key, token, user_data)
                 return user_data
             return None
             
         except Exception as e:
             logger.error(f"Token verification error: {str(e)}", exc_info=True)
             return None
+    
+    def _cache_token(self, key: bytes, token: str, user_data: Dict[str, Any]) -> None:
+        """Cache a verified token until min(exp, now + TOKEN_CACHE_TTL)."""
+        expires_at = time.time() + self.TOKEN_CACHE_TTL
+        exp = self._token_exp(token)
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        with self._token_lock:
+            self._token_cache[key] = (expires_at, user_data)
+            self._token_cache.move_to_end(key)
+            while len(self._token_cache) > self.TOKEN_CACHE_MAX:
+                self._token_cache.popitem(last=False)
+    
+    @staticmethod
+    def _token_exp(token: str) -> Optional[float]:
+        """Read the ``exp`` claim without verifying (Supabase already verified the token)."""
+        try:
+            payload = token.split(".")[1]
+            claims = loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+            return float(claims["exp"])
+        except Exception:
+            return None
+    
+    # ============================================================================
+    # Async Wrappers (run the blocking client on a worker thread)
+    # ============================================================================
+    
+    async def aupdate_agent_last_used(self, installed_agent_id: str):
+        """Async variant of update_agent_last_used."""
+        return await asyncio.to_thread(self.update_agent_last_used, installed_agent_id)
 
 
-# Global singleton instance
+# Global singleton instance; the client itself is created on first use
 supabase_service = SupabaseService()
 
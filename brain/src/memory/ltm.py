@@ -1,3 +1,6 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 from memory.ltm_core.tag_manager import TagManager
 from agents.memory_agent import MemoryAgent, TaggedMemories
@@ -5,6 +8,8 @@ from memory.ltm_core.vector_manager import FlattenedMemory, VectorManager
 from memory.ltm_core.neo4j_db import GraphManager
 from memory.ltm_core.retriever import MemoryRetriever
 
+logger = logging.getLogger(__name__)
+
 
 class MemoryService:
     """
@@ -17,10 +22,22 @@ class MemoryService:
     def __init__(self, user_id: str):
         self.user_id = user_id
         self.tag_manager = TagManager(user_id=user_id)
-        self.memory_agent = MemoryAgent(user_id=self.user_id)
+        self._memory_agent = None
         self.vector_manager = VectorManager(user_id=self.user_id)
         self.graph_manager = GraphManager()
-        self.retriever = MemoryRetriever(user_id=self.user_id)
+        self.retriever = MemoryRetriever(
+            user_id=self.user_id,
+            vector_manager=self.vector_manager,
+            graph_manager=self.graph_manager,
+        )
+
+    @property
+    def memory_agent(self) -> MemoryAgent:
+        """MemoryAgent, created on first extraction so chat turns that never move
+        messages to LTM don't pay for the model client and tag lookup."""
+        if self._memory_agent is None:
+            self._memory_agent = MemoryAgent(user_id=self.user_id)
+        return self._memory_agent
 
     # ──────────────────────────────────────────────
     # 2️⃣ Main Processing Pipeline
@@ -31,17 +48,22 @@ class MemoryService:
         """
         Full memory pipeline:
           1. Extract memories (via LLM agent)
-          2. Store tags in Supabase
+          2. Store tags in Supabase (concurrently with 3 and 4)
           3. Store embeddings in LanceDB (Azure Blob)
           4. Create graph relationships in Neo4j
         """
         tagged_memories = await self._extract_memories(conversation)
         if not tagged_memories:
-            print(f"⚠️ No memories extracted for user: {self.user_id}")
+            logger.warning("No memories extracted for user: %s", self.user_id)
             return {}
-        self._store_tags(tagged_memories)
-        flattened_memories = self._store_vectors(tagged_memories)
-        self._store_graph(flattened_memories)
+        # Tags don't depend on the vector store, so write them while embedding;
+        # the graph only needs the flattened vector output
+        tag_task = asyncio.create_task(asyncio.to_thread(self._store_tags, tagged_memories))
+        try:
+            flattened_memories = await asyncio.to_thread(self._store_vectors, tagged_memories)
+            await asyncio.to_thread(self._store_graph, flattened_memories)
+        finally:
+            await tag_task
 
     def search_memories(self, user_message: str, top_k: int = 5) -> Dict:
         """Search memories using the MemoryRetriever"""
@@ -57,8 +79,8 @@ class MemoryService:
         try:
             tagged_memories = await self.memory_agent.extract_memories(conversation)
             return tagged_memories or {}
-        except Exception as e:
-            print(f"❌ Error extracting memories: {e}")
+        except Exception:
+            logger.exception("Error extracting memories")
             return {}
 
     # ──────────────────────────────────────────────
@@ -70,9 +92,9 @@ class MemoryService:
             tags = list(tagged_memories.keys())
             if tags:
                 self.tag_manager.save_tags(tags)
-                # print(f"✓ Tags saved in SQL for user: {self.user_id}")
-        except Exception as e:
-            print(f"❌ Error storing tags: {e}")
+                logger.debug("Tags saved in SQL for user: %s", self.user_id)
+        except Exception:
+            logger.exception("Error storing tags")
 
     # ──────────────────────────────────────────────
     # 5️⃣ Store Vectors (LanceDB + Azure Blob)
@@ -82,10 +104,9 @@ class MemoryService:
         flattened_memories: List[FlattenedMemory] = []
         try:
             flattened_memories = self.vector_manager.add_memories(tagged_memories)
-            print(
-                f"✓ Stored long-term memory in LanceDB (Azure Blob) for user: {self.user_id}")
-        except Exception as e:
-            print(f"❌ Error storing vectors: {e}")
+            logger.debug("Stored long-term memory in LanceDB (Azure Blob) for user: %s", self.user_id)
+        except Exception:
+            logger.exception("Error storing vectors")
         return flattened_memories
     # ──────────────────────────────────────────────
     # 6️⃣ Store Relationships (Neo4j)
@@ -96,9 +117,9 @@ class MemoryService:
         try:
             self.graph_manager.store_memory_graph(
                 self.user_id, flattened_memories)
-            print(f"✓ Graph relationships updated for user: {self.user_id}")
-        except Exception as e:
-            print(f"❌ Error storing graph data: {e}")
+            logger.debug("Graph relationships updated for user: %s", self.user_id)
+        except Exception:
+            logger.exception("Error storing graph data")
 
     def export_to_excel(self, output_path: str):
         """Get messages directly from LTM (Long-Term Memory)"""
@@ -117,44 +138,36 @@ class MemoryService:
         Returns:
             True if all deletions were successful, False otherwise
         """
-        success_count = 0
-        total_operations = 3
+        logger.info("Starting deletion of all data for user: %s", self.user_id)
         
-        print(f"\n🗑️  Starting deletion of all data for user: {self.user_id}")
-        print("=" * 60)
+        def clear_tags() -> bool:
+            self.tag_manager.clear_tags()
+            return True
         
-        # 1. Delete FAISS vector data
-        try:
-            if self.vector_manager.delete_all():
-                print("✓ FAISS data deleted successfully")
-                success_count += 1
-            else:
-                print("❌ Failed to delete FAISS data")
-        except Exception as e:
-            print(f"❌ Error deleting FAISS data: {e}")
+        steps = {
+            "FAISS data": self.vector_manager.delete_all,
+            "Neo4j graph data": lambda: self.graph_manager.delete_all(self.user_id),
+            "Supabase tags": clear_tags,
+        }
         
-        # 2. Delete Neo4j graph data
-        try:
-            if self.graph_manager.delete_all(self.user_id):
-                print("✓ Neo4j graph data deleted successfully")
-                success_count += 1
-            else:
-                print("❌ Failed to delete Neo4j graph data")
-        except Exception as e:
-            print(f"❌ Error deleting Neo4j graph data: {e}")
+        # The backends are independent, so delete from all of them at once
+        with ThreadPoolExecutor(max_workers=len(steps)) as executor:
+            futures = {name: executor.submit(step) for name, step in steps.items()}
         
-        # 3. Delete Supabase tags
-        try:
-            self.tag_manager.clear_tags()
-            print("✓ Supabase tags deleted successfully")
-            success_count += 1
-        except Exception as e:
-            print(f"❌ Error deleting Supabase tags: {e}")
+        success_count = 0
+        for name, future in futures.items():
+            try:
+                if future.result():
+                    logger.debug("%s deleted successfully", name)
+                    success_count += 1
+                else:
+                    logger.error("Failed to delete %s", name)
+            except Exception:
+                logger.exception("Error deleting %s", name)
         
-        print("=" * 60)
-        if success_count == total_operations:
-            print(f"✅ Successfully deleted all data for user: {self.user_id}")
+        if success_count == len(steps):
+            logger.info("Successfully deleted all data for user: %s", self.user_id)
             return True
         else:
-            print(f"⚠️  Deleted {success_count}/{total_operations} data sources for user: {self.user_id}")
+            logger.warning("Deleted %s/%s data sources for user: %s", success_count, len(steps), self.user_id)
             return False
@@ -0,0 +1,105 @@
+"""
+Persistent embedding cache for long-term memory.
+
+Summaries are re-embedded during dedup/merge cycles and repeated queries embed
+the same text again; both are served from here instead of the embeddings API.
+Vectors are stored as float16 to halve the on-disk size.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """SQLite-backed text -> embedding cache with a small in-memory LRU in front."""
+
+    def __init__(self, db_path: str, model: str, max_memory_entries: int = 512):
+        self.db_path = db_path
+        self.model = model
+        self.max_memory_entries = max_memory_entries
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """Return cached float32 embeddings for the given texts, keyed by text."""
+        found: Dict[str, np.ndarray] = {}
+        misses: Dict[str, str] = {}
+        with self._lock:
+            for text in texts:
+                key = self.key(text)
+                embedding = self._memory.get(key)
+                if embedding is not None:
+                    self._memory.move_to_end(key)
+                    found[text] = embedding
+                else:
+                    misses[key] = text
+            if misses:
+                try:
+                    rows = self._conn().execute(
+                        f"SELECT key, embedding FROM embeddings WHERE key IN ({','.join('?' * len(misses))})",
+                        list(misses),
+                    ).fetchall()
+                except sqlite3.Error as e:
+                    logger.warning("Embedding cache read failed: %s", e)
+                    rows = []
+                for key, blob in rows:
+                    embedding = np.frombuffer(blob, dtype="float16").astype("float32")
+                    self._remember(key, embedding)
+                    found[misses[key]] = embedding
+        return found
+
+    def set_many(self, embeddings: Dict[str, np.ndarray]) -> None:
+        """Store float32 embeddings keyed by text."""
+        if not embeddings:
+            return
+        rows = []
+        with self._lock:
+            for text, embedding in embeddings.items():
+                key = self.key(text)
+                self._remember(key, np.asarray(embedding, dtype="float32"))
+                rows.append((key, np.asarray(embedding, dtype="float16").tobytes()))
+            try:
+                db = self._conn()
+                db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)", rows)
+                db.commit()
+            except sqlite3.Error as e:
+                logger.warning("Embedding cache write failed: %s", e)
+
+    def close(self) -> None:
+        """Close the database and drop in-memory entries (reopened on next use)."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key: str, embedding: np.ndarray) -> None:
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    embedding BLOB NOT NULL
+                )
+            """)
+            self._db.commit()
+        return self._db
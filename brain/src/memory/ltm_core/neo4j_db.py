@@ -1,23 +1,165 @@
-from typing import List
-from neo4j import GraphDatabase
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from neo4j import Driver, GraphDatabase
+import atexit
 import os
 import dotenv
+import logging
+import threading
 
 from memory.ltm_core.vector_manager import FlattenedMemory
 
+logger = logging.getLogger(__name__)
+
 dotenv.load_dotenv()
 
+# Process-wide driver, created lazily on first use. The driver owns the
+# connection pool and is thread-safe, so every GraphManager shares it.
+_driver: Optional[Driver] = None
+_driver_lock = threading.Lock()
+
+# Naming the database on every session skips the home-database lookup round-trip
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
+
+# Uniqueness constraints back every MERGE key with an index, so MERGE does an
+# index seek instead of a label scan
+_CONSTRAINTS = (
+    "CREATE CONSTRAINT memory_id IF NOT EXISTS FOR (m:Memory) REQUIRE m.id IS UNIQUE",
+    "CREATE CONSTRAINT user_id IF NOT EXISTS FOR (u:User) REQUIRE u.id IS UNIQUE",
+    "CREATE CONSTRAINT tag_name IF NOT EXISTS FOR (t:Tag) REQUIRE t.name IS UNIQUE",
+    "CREATE CONSTRAINT entity_name IF NOT EXISTS FOR (e:Entity) REQUIRE e.name IS UNIQUE",
+)
+
+
+# ───────────────────────────────────────────────
+# CYPHER
+# ───────────────────────────────────────────────
+# Every query is a fixed module-level string and all values travel as
+# parameters. Neo4j caches plans by query text, so never build query text
+# with f-strings or concatenation: each variant would be planned afresh.
+_CYPHER_EXISTING_MEMORY_IDS = """
+MATCH (m:Memory)
+WHERE m.id IN $memory_ids
+RETURN COLLECT(m.id) as existing_ids
+"""
+
+_CYPHER_STORE_MEMORY_GRAPH = """
+MERGE (u:User {id: $user_id})
+SET u.name = $user_id
+WITH u
+UNWIND $rows AS r
+MERGE (m:Memory {id: r.id})
+ON CREATE SET m._created = true
+WITH u, r, m, coalesce(m._created, false) AS is_new
+REMOVE m._created
+WITH u, r, m WHERE is_new
+MERGE (t:Tag {name: r.tag})
+MERGE (u)-[:HAS_MEMORY]->(m)
+MERGE (m)-[:BELONGS_TO_TAG]->(t)
+WITH u, r, m
+CALL {
+    WITH u, r, m
+    UNWIND r.entities AS e
+    MERGE (ent:Entity {name: e})
+    MERGE (u)-[:HAS_ENTITY]->(ent)
+    MERGE (m)-[:MENTIONS]->(ent)
+}
+RETURN count(m) AS created
+"""
+
+_CYPHER_RELATED_MEMORY_IDS = """
+MATCH (m:Memory)-[:MENTIONS]->(:Entity)<-[:MENTIONS]-(related:Memory)
+WHERE m.id IN $memory_ids AND related.id <> m.id
+RETURN DISTINCT related.id AS memory_id
+LIMIT $limit
+UNION
+MATCH (m:Memory)-[:BELONGS_TO_TAG]->(:Tag)<-[:BELONGS_TO_TAG]-(related:Memory)
+WHERE m.id IN $memory_ids AND related.id <> m.id
+RETURN DISTINCT related.id AS memory_id
+LIMIT $limit
+"""
+
+_CYPHER_DELETE_USER_MEMORIES = """
+MATCH (:User {id: $user_id})-[:HAS_MEMORY]->(m:Memory)
+DETACH DELETE m
+RETURN count(m) AS n
+"""
+
+_CYPHER_DELETE_USER_ENTITY_RELS = """
+MATCH (:User {id: $user_id})-[r:HAS_ENTITY]->(:Entity)
+DELETE r
+RETURN count(r) AS n
+"""
+
+_CYPHER_DELETE_ORPHAN_TAGS = """
+MATCH (t:Tag)
+WHERE NOT (t)<-[:BELONGS_TO_TAG]-(:Memory)
+DELETE t
+RETURN count(t) AS n
+"""
+
+_CYPHER_DELETE_ORPHAN_ENTITIES = """
+MATCH (e:Entity)
+WHERE NOT (e)<-[:MENTIONS]-(:Memory)
+   AND NOT (e)<-[:HAS_ENTITY]-(:User)
+DELETE e
+RETURN count(e) AS n
+"""
+
+_CYPHER_DELETE_USER = """
+MATCH (u:User {id: $user_id})
+DETACH DELETE u
+RETURN count(u) AS n
+"""
+
+
+def _ensure_constraints(driver: Driver) -> None:
+    """Create the graph's uniqueness constraints (idempotent)."""
+    try:
+        with driver.session(database=NEO4J_DATABASE) as session:
+            for statement in _CONSTRAINTS:
+                session.run(statement).consume()
+    except Exception as e:
+        logger.warning("Could not create Neo4j constraints: %s", e)
+
+
+def get_driver() -> Driver:
+    """Get the shared Neo4j driver."""
+    global _driver
+    if _driver is None:
+        with _driver_lock:
+            if _driver is None:
+                _driver = GraphDatabase.driver(
+                    os.getenv("NEO4J_URI"),
+                    auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD")),
+                    max_connection_pool_size=int(os.getenv("NEO4J_MAX_POOL_SIZE", "100")),
+                )
+                atexit.register(close_driver)
+                _ensure_constraints(_driver)
+    return _driver
+
+
+def close_driver() -> None:
+    """Close the shared driver (called at interpreter exit)."""
+    global _driver
+    with _driver_lock:
+        if _driver is not None:
+            _driver.close()
+            _driver = None
+
+
 class GraphManager:
     """Handles Neo4j graph storage and retrieval for relationships, entities, and tags."""
 
+    # Rows per UNWIND transaction, and how many of those transactions may run at once
+    STORE_BATCH_SIZE = 1000
+    STORE_MAX_PARALLEL = 4
+
     def __init__(self):
-        self.driver = GraphDatabase.driver(
-            os.getenv("NEO4J_URI"),
-            auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD"))
-        )
+        self.driver = get_driver()
 
     def close(self):
-        self.driver.close()
+        """No-op: the shared driver is closed at exit by close_driver()."""
 
     # ───────────────────────────────────────────────
     # CHECK EXISTING MEMORIES
@@ -27,14 +169,13 @@ class GraphManager:
         if not memory_ids:
             return set()
         
-        with self.driver.session() as session:
-            result = session.run("""
-                MATCH (m:Memory)
-                WHERE m.id IN $memory_ids
-                RETURN COLLECT(m.id) as existing_ids
-            """, memory_ids=memory_ids)
-            record = result.single()
-            return set(record["existing_ids"]) if record and record["existing_ids"] else set()
+        with self.driver.session(database=NEO4J_DATABASE) as session:
+            return session.execute_read(self._read_existing_memory_ids, memory_ids)
+
+    @staticmethod
+    def _read_existing_memory_ids(tx, memory_ids: List[str]) -> set:
+        record = tx.run(_CYPHER_EXISTING_MEMORY_IDS, memory_ids=memory_ids).single()
+        return set(record["existing_ids"]) if record and record["existing_ids"] else set()
 
     # ───────────────────────────────────────────────
     # CREATE NODES & RELATIONSHIPS
@@ -55,50 +196,39 @@ class GraphManager:
         if not memories:
             return
 
-        # Get list of existing memory IDs to skip
-        memory_ids = [m.id for m in memories]
-        existing_ids = self.get_existing_memory_ids(memory_ids)
-        
-        # Filter out existing memories
-        new_memories = [m for m in memories if m.id not in existing_ids]
-        skipped_count = len(memories) - len(new_memories)
-        
+        rows = [
+            {"id": m.id, "tag": m.tag, "entities": [e for e in m.entities if e]}
+            for m in memories
+        ]
+        chunks = [rows[i:i + self.STORE_BATCH_SIZE] for i in range(0, len(rows), self.STORE_BATCH_SIZE)]
+        if len(chunks) == 1:
+            created = self._store_chunk(user_id, chunks[0])
+        else:
+            # MERGEs are idempotent, so chunks can commit in any order; each
+            # runs in its own session and transient lock conflicts are retried
+            # by execute_write
+            with ThreadPoolExecutor(max_workers=min(self.STORE_MAX_PARALLEL, len(chunks))) as executor:
+                created = sum(executor.map(lambda chunk: self._store_chunk(user_id, chunk), chunks))
+
+        skipped_count = len(memories) - created
         if skipped_count > 0:
-            print(f"⊘ Skipped {skipped_count} existing memories in Neo4j")
+            logger.info("Skipped %s existing memories in Neo4j", skipped_count)
 
-        if not new_memories:
-            return
+    def _store_chunk(self, user_id: str, rows: List[dict]) -> int:
+        with self.driver.session(database=NEO4J_DATABASE) as session:
+            return session.execute_write(self._write_memory_graph, user_id, rows)
 
-        with self.driver.session() as session:
-            # Make sure user node exists once
-            session.run("""
-                MERGE (u:User {id: $user_id})
-                SET u.name = $user_id
-            """, user_id=user_id)
-
-            # Then loop memories
-            for m in new_memories:
-                session.run("""
-                    MATCH (u:User {id: $user_id})
-                    MERGE (t:Tag {name: $tag})
-                    MERGE (m:Memory {id: $memory_id})
-                    SET m.id = $memory_id
-                    MERGE (u)-[:HAS_MEMORY]->(m)
-                    MERGE (m)-[:BELONGS_TO_TAG]->(t)
-                """, 
-                user_id=user_id,
-                tag=m.tag,
-                memory_id=m.id,)
-
-                for e in m.entities:
-                    if e:
-                        session.run("""
-                            MATCH (u:User {id: $user_id})
-                            MATCH (m:Memory {id: $memory_id})
-                            MERGE (ent:Entity {name: $entity})
-                            MERGE (u)-[:HAS_ENTITY]->(ent)
-                            MERGE (m)-[:MENTIONS]->(ent)
-                        """, user_id=user_id, memory_id=m.id, entity=e)
+    @staticmethod
+    def _write_memory_graph(tx, user_id: str, rows: List[dict]) -> int:
+        """
+        Write memories, tags and entities in one UNWIND query.
+
+        Existing memories are detected by the MERGE itself (ON CREATE marks new
+        nodes), so they are skipped without a separate lookup round-trip.
+        Returns the number of memories created.
+        """
+        record = tx.run(_CYPHER_STORE_MEMORY_GRAPH, user_id=user_id, rows=rows).single()
+        return record["created"] if record else 0
 
 
     # ───────────────────────────────────────────────
@@ -112,27 +242,20 @@ class GraphManager:
         if not memory_ids:
             return []
 
-        related_ids = set()
-        with self.driver.session() as session:
-            # Find memories connected via shared entities
-            ent_result = session.run("""
-                MATCH (m:Memory)-[:MENTIONS]->(e:Entity)<-[:MENTIONS]-(related:Memory)
-                WHERE m.id IN $memory_ids AND related.id <> m.id
-                RETURN DISTINCT related.id AS memory_id
-                LIMIT $limit
-            """, memory_ids=memory_ids, limit=limit)
-            related_ids.update([r["memory_id"] for r in ent_result])
-
-            # Find memories connected via shared tags
-            tag_result = session.run("""
-                MATCH (m:Memory)-[:BELONGS_TO_TAG]->(t:Tag)<-[:BELONGS_TO_TAG]-(related:Memory)
-                WHERE m.id IN $memory_ids AND related.id <> m.id
-                RETURN DISTINCT related.id AS memory_id
-                LIMIT $limit
-            """, memory_ids=memory_ids, limit=limit)
-            related_ids.update([r["memory_id"] for r in tag_result])
-
-        return list(related_ids)
+        with self.driver.session(database=NEO4J_DATABASE) as session:
+            related_ids = session.execute_read(self._read_related_memory_ids, memory_ids, limit)
+
+        return related_ids
+
+    @staticmethod
+    def _read_related_memory_ids(tx, memory_ids: list, limit: int) -> list:
+        """
+        Fetch memories sharing an entity or a tag in one round-trip.
+
+        Each branch keeps its own LIMIT; UNION deduplicates across them.
+        """
+        result = tx.run(_CYPHER_RELATED_MEMORY_IDS, memory_ids=memory_ids, limit=limit)
+        return [record["memory_id"] for record in result]
     
     # ───────────────────────────────────────────────
     # DELETE ALL DATA FOR USER
@@ -153,81 +276,49 @@ class GraphManager:
             True if deletion was successful, False otherwise
         """
         try:
-            with self.driver.session() as session:
-                # First, get count of memories to delete for logging
-                count_result = session.run("""
-                    MATCH (u:User {id: $user_id})-[:HAS_MEMORY]->(m:Memory)
-                    RETURN COUNT(m) as memory_count
-                """, user_id=user_id)
-                record = count_result.single()
-                memory_count = record["memory_count"] if record else 0
-                
-                # Delete all Memory nodes and their relationships
-                # This will cascade delete relationships to Tags and Entities
-                session.run("""
-                    MATCH (u:User {id: $user_id})-[:HAS_MEMORY]->(m:Memory)
-                    DETACH DELETE m
-                """, user_id=user_id)
-                
-                if memory_count > 0:
-                    print(f"✓ Deleted {memory_count} Memory nodes for user: {user_id}")
-                
-                # Delete all HAS_ENTITY relationships from User
-                entity_rel_result = session.run("""
-                    MATCH (u:User {id: $user_id})-[r:HAS_ENTITY]->(e:Entity)
-                    DELETE r
-                    RETURN COUNT(r) as rel_count
-                """, user_id=user_id)
-                entity_rel_record = entity_rel_result.single()
-                entity_rel_count = entity_rel_record["rel_count"] if entity_rel_record else 0
-                
-                if entity_rel_count > 0:
-                    print(f"✓ Deleted {entity_rel_count} HAS_ENTITY relationships for user: {user_id}")
-                
-                # Delete orphaned Tags (Tags with no remaining Memory connections)
-                orphaned_tags_result = session.run("""
-                    MATCH (t:Tag)
-                    WHERE NOT (t)<-[:BELONGS_TO_TAG]-(:Memory)
-                    DELETE t
-                    RETURN COUNT(t) as tag_count
-                """)
-                orphaned_tags_record = orphaned_tags_result.single()
-                orphaned_tags_count = orphaned_tags_record["tag_count"] if orphaned_tags_record else 0
-                
-                if orphaned_tags_count > 0:
-                    print(f"✓ Deleted {orphaned_tags_count} orphaned Tag nodes")
-                
-                # Delete orphaned Entities (Entities with no remaining Memory or User connections)
-                orphaned_entities_result = session.run("""
-                    MATCH (e:Entity)
-                    WHERE NOT (e)<-[:MENTIONS]-(:Memory)
-                       AND NOT (e)<-[:HAS_ENTITY]-(:User)
-                    DELETE e
-                    RETURN COUNT(e) as entity_count
-                """)
-                orphaned_entities_record = orphaned_entities_result.single()
-                orphaned_entities_count = orphaned_entities_record["entity_count"] if orphaned_entities_record else 0
-                
-                if orphaned_entities_count > 0:
-                    print(f"✓ Deleted {orphaned_entities_count} orphaned Entity nodes")
-                
-                # Finally, delete the User node itself
-                user_delete_result = session.run("""
-                    MATCH (u:User {id: $user_id})
-                    DELETE u
-                    RETURN COUNT(u) as user_count
-                """, user_id=user_id)
-                user_delete_record = user_delete_result.single()
-                user_count = user_delete_record["user_count"] if user_delete_record else 0
-                
-                if user_count > 0:
-                    print(f"✓ Deleted User node for user: {user_id}")
-                
-                print(f"✓ Successfully deleted all Neo4j data for user: {user_id}")
-                return True
-                
+            with self.driver.session(database=NEO4J_DATABASE) as session:
+                counts = session.execute_write(self._delete_user_graph, user_id)
+
+            if counts["memories"] > 0:
+                logger.info("Deleted %s Memory nodes for user: %s", counts["memories"], user_id)
+            if counts["entity_rels"] > 0:
+                logger.info("Deleted %s HAS_ENTITY relationships for user: %s", counts["entity_rels"], user_id)
+            if counts["tags"] > 0:
+                logger.info("Deleted %s orphaned Tag nodes", counts["tags"])
+            if counts["entities"] > 0:
+                logger.info("Deleted %s orphaned Entity nodes", counts["entities"])
+            if counts["users"] > 0:
+                logger.info("Deleted User node for user: %s", user_id)
+
+            logger.info("Successfully deleted all Neo4j data for user: %s", user_id)
+            return True
+
         except Exception as e:
-            print(f"❌ Error deleting Neo4j data for user {user_id}: {e}")
-            import traceback
-            traceback.print_exc()
-            return True
\ No newline at end of file
+            logger.exception("Error deleting Neo4j data for user %s: %s", user_id, e)
+            return False
+
+    @staticmethod
+    def _delete_user_graph(tx, user_id: str) -> dict:
+        """
+        Delete a user's graph in a single transaction.
+
+        Memories and the user's HAS_ENTITY links go first, then Tags and Entities
+        left without any connection, then the User node. Returns deletion counts.
+        """
+        memories = tx.run(_CYPHER_DELETE_USER_MEMORIES, user_id=user_id).single()["n"]
+
+        entity_rels = tx.run(_CYPHER_DELETE_USER_ENTITY_RELS, user_id=user_id).single()["n"]
+
+        tags = tx.run(_CYPHER_DELETE_ORPHAN_TAGS).single()["n"]
+
+        entities = tx.run(_CYPHER_DELETE_ORPHAN_ENTITIES).single()["n"]
+
+        users = tx.run(_CYPHER_DELETE_USER, user_id=user_id).single()["n"]
+
+        return {
+            "memories": memories,
+            "entity_rels": entity_rels,
+            "tags": tags,
+            "entities": entities,
+            "users": users,
+        }
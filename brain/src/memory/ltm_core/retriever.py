@@ -1,23 +1,96 @@
-from typing import List, Dict
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Optional
 
+import numpy as np
 from autogen_core.models import AssistantMessage
 from memory.ltm_core.vector_manager import VectorManager
 from memory.ltm_core.neo4j_db import GraphManager
 
 class MemoryRetriever:
-    def __init__(self, user_id: str):
+    # Context strings for recent queries, keyed by the vector store version
+    RESULT_CACHE_MAX = 256
+    RESULT_CACHE_TTL = 60.0
+    # Cosine similarity at which a different message reuses a cached result
+    SEMANTIC_HIT_THRESHOLD = 0.95
+
+    def __init__(
+        self,
+        user_id: str,
+        vector_manager: Optional[VectorManager] = None,
+        graph_manager: Optional[GraphManager] = None,
+    ):
         self.user_id = user_id
-        self.vector_manager = VectorManager(user_id=user_id)
-        self.graph_manager = GraphManager()
+        # Share the caller's managers so searches see memories it just added
+        self.vector_manager = vector_manager or VectorManager(user_id=user_id)
+        self.graph_manager = graph_manager or GraphManager()
+        # key -> (expires_at, context string, normalized query embedding or None)
+        self._result_cache: "OrderedDict[tuple, tuple[float, str, Optional[np.ndarray]]]" = OrderedDict()
+        self._result_lock = threading.Lock()
 
     def search_memories(self, user_message: str, top_k: int = 5) -> Dict:
         """
         Retrieve relevant memories based on user message using both FAISS and Neo4j.
+
+        Results are cached per (store version, normalized message, top_k), so a
+        repeated message skips the embedding call and graph expansion until the
+        store changes or RESULT_CACHE_TTL passes. A new message whose embedding
+        is within SEMANTIC_HIT_THRESHOLD of a cached one reuses that result and
+        skips the FAISS search and graph expansion.
         """
+        version = self.vector_manager.version
+        key = (version, " ".join(user_message.split()), top_k)
+        now = time.monotonic()
+        with self._result_lock:
+            cached = self._result_cache.get(key)
+            if cached is not None and cached[0] > now:
+                self._result_cache.move_to_end(key)
+                return cached[1]
+
+        # Embedded once here and reused by the FAISS search on a miss
+        embeddings = self.vector_manager.embed_query(user_message) if len(self.vector_manager.store) else None
+        if embeddings is not None:
+            similar = self._semantic_lookup(embeddings[0], version, top_k, now)
+            if similar is not None:
+                return similar
+
+        context_string = self._search_memories(user_message, top_k, embeddings)
+
+        with self._result_lock:
+            self._result_cache[key] = (
+                now + self.RESULT_CACHE_TTL,
+                context_string,
+                embeddings[0] if embeddings is not None else None,
+            )
+            self._result_cache.move_to_end(key)
+            while len(self._result_cache) > self.RESULT_CACHE_MAX:
+                self._result_cache.popitem(last=False)
+        return context_string
+
+    def _semantic_lookup(self, embedding: np.ndarray, version: int, top_k: int, now: float) -> Optional[str]:
+        """Return the cached result of the closest live entry above the threshold, if any."""
+        with self._result_lock:
+            entries = [
+                (key, entry) for key, entry in self._result_cache.items()
+                if key[0] == version and key[2] == top_k and entry[0] > now and entry[2] is not None
+            ]
+            if not entries:
+                return None
+            # Embeddings are unit length, so the dot product is the cosine similarity
+            scores = np.stack([entry[2] for _, entry in entries]) @ embedding
+            best = int(np.argmax(scores))
+            if scores[best] < self.SEMANTIC_HIT_THRESHOLD:
+                return None
+            key, entry = entries[best]
+            self._result_cache.move_to_end(key)
+            return entry[1]
+
+    def _search_memories(self, user_message: str, top_k: int, embeddings: Optional[np.ndarray] = None) -> str:
         # ───────────────────────────────────────────────
         # STEP 1: Search in FAISS
         # ───────────────────────────────────────────────
-        similar_memories = self.vector_manager.search(user_message, top_k=top_k)
+        similar_memories = self.vector_manager.search(user_message, top_k=top_k, embeddings=embeddings)
         # Example format: [{"id": "uuid", "summary": "...", "score": 0.78}]
         memory_ids = [m["id"] for m in similar_memories]
         # ───────────────────────────────────────────────
@@ -29,17 +102,19 @@ class MemoryRetriever:
         # STEP 3: Combine and deduplicate
         # ───────────────────────────────────────────────
         all_memories = {m["id"]: m for m in similar_memories}
-        for r in related_memories_ids:
-            if r not in all_memories.keys():
-                all_memories[r] = self.get_memory_by_id(r)
+        # Fetch every related memory in one batched lookup
+        missing_ids = [r for r in related_memories_ids if r not in all_memories]
+        for memory in self.vector_manager.get_memories_by_ids(missing_ids):
+            all_memories[memory["id"]] = memory
 
         # ───────────────────────────────────────────────
         # STEP 4: Sort by FAISS similarity or importance
         # ───────────────────────────────────────────────
-        # Join all memories into a single context string
+        # Join all memories into a single context string; graph-only matches
+        # have no similarity and rank after the direct hits
         sorted_memories = sorted(
             all_memories.values(),
-            key=lambda x: x.get("score", 0) * x.get("importance", 1),
+            key=lambda x: x.get("similarity", 0) * x.get("importance", 1),
             reverse=True
         )
         # Create single context string from summaries
@@ -1,13 +1,18 @@
 """
 Tag Manager - stores and retrieves tags by user_id in Supabase
 """
-from typing import List
+import time
+from typing import Dict, List, Tuple
 from brain_core.sup_extractor import supabase_service
 
 
 class TagManager:
     """Manages tags in Supabase storage"""
 
+    # Tags per user shared by all instances: user_id -> (expires_at, tags)
+    _tags_cache: Dict[str, Tuple[float, List[str]]] = {}
+    TAGS_CACHE_TTL = 60.0
+
     def __init__(self, user_id: str):
         self.user_id = user_id
         self.table_name = "user_tags"
@@ -15,19 +20,32 @@ class TagManager:
     def save_tag(self, tag: str):
         """Save a tag for this user"""
         supabase_service.save_tag(self.user_id, tag, self.table_name)
+        self._invalidate_tags()
 
     def save_tags(self, tags: List[str]):
         """Save multiple tags for this user"""
         supabase_service.save_tags(self.user_id, tags, self.table_name)
+        self._invalidate_tags()
 
     def get_tags(self) -> List[str]:
-        """Get all unique tags for this user"""
-        return supabase_service.get_tags(self.user_id, self.table_name)
+        """Get all unique tags for this user (cached for TAGS_CACHE_TTL seconds)"""
+        cached = self._tags_cache.get(self.user_id)
+        if cached and cached[0] > time.monotonic():
+            return list(cached[1])
+
+        tags = supabase_service.get_tags(self.user_id, self.table_name)
+        self._tags_cache[self.user_id] = (time.monotonic() + self.TAGS_CACHE_TTL, tags)
+        return list(tags)
 
     def clear_tags(self):
         """Clear all tags for this user"""
         supabase_service.clear_tags(self.user_id, self.table_name)
+        self._invalidate_tags()
 
     def tag_exists(self, tag: str) -> bool:
         """Check if a tag already exists for this user"""
         return supabase_service.tag_exists(self.user_id, tag, self.table_name)
+
+    def _invalidate_tags(self):
+        """Drop the cached tags so the next read hits Supabase"""
+        self._tags_cache.pop(self.user_id, None)
@@ -1,31 +1,52 @@
 import os
+import atexit
+import logging
+import threading
 import time
-import math
 import pickle
 import shutil
+import weakref
+from contextlib import contextmanager
 import faiss
 import numpy as np
 from openai import AzureOpenAI
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional
 import pandas as pd
 from datetime import datetime
 
 from agents.memory_agent import TaggedMemories
+from brain_core.fast_json import dumps_bytes, loads
+from memory.ltm_core.embedding_cache import EmbeddingCache
+
+try:
+    import fcntl
+except ImportError:  # Windows: single process, no cross-process locking needed
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def _as_float(value: Any, default: float) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
 
 
 # ──────────────────────────────────────────────
 # Flattened Memory Representation
 # ──────────────────────────────────────────────
-class FlattenedMemory(BaseModel):
-    id: str = Field(default="")
-    summary: str = Field(default="")
-    tag: str = Field(default="untagged")
-    importance: float = Field(default=0.1, ge=0.0, le=1.0)
-    confidence: float = Field(default=0.1, ge=0.0, le=1.0)
-    entities: List[str] = Field(default_factory=list)
-    user_id: str = Field(default="")
-    last_accessed: float = Field(default_factory=time.time)
+@dataclass(slots=True)
+class FlattenedMemory:
+    id: str = ""
+    summary: str = ""
+    tag: str = "untagged"
+    importance: float = 0.1
+    confidence: float = 0.1
+    entities: List[str] = field(default_factory=list)
+    user_id: str = ""
+    last_accessed: float = field(default_factory=time.time)
 
     def to_dict(self):
         return {
@@ -41,7 +62,12 @@ class FlattenedMemory(BaseModel):
 
     @classmethod
     def from_memory_item(cls, memory_item: Any, tag: str, user_id: str):
-        """Convert memory dict/object into FlattenedMemory."""
+        """
+        Convert memory dict/object into FlattenedMemory.
+
+        This is the only entry point for untrusted (LLM) values, so scores are
+        coerced and clamped to [0, 1] here.
+        """
         get = lambda k, default=None: (
             getattr(memory_item, k, None)
             or (memory_item.get(k, default) if isinstance(memory_item, dict) else default)
@@ -65,23 +91,219 @@ class FlattenedMemory(BaseModel):
             id=get("id", ""),
             summary=get("summary", ""),
             tag=tag,
-            importance=get("importance", 0.1),
-            confidence=get("confidence", 0.1),
-            entities=get("entities", []),
+            importance=min(1.0, max(0.0, _as_float(get("importance", 0.1), 0.1))),
+            confidence=min(1.0, max(0.0, _as_float(get("confidence", 0.1), 0.1))),
+            entities=list(get("entities", []) or []),
             user_id=user_id,
             last_accessed=timestamp_float,
         )
 
 
+# ──────────────────────────────────────────────
+# Columnar Memory Metadata
+# ──────────────────────────────────────────────
+def _atomic_write(path: str, write) -> None:
+    """Write through a temp file and rename, so readers never see a partial file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+class MemoryStore:
+    """
+    Memory metadata split by access pattern (row i matches FAISS id i).
+
+    The string fields (id, summary, tag, entities, user_id) live in an
+    append-only JSON Lines log: adds and merges append one line per changed
+    record, and a later line for the same id replaces the earlier one on load.
+    The log is compacted once it holds COMPACT_RATIO times more lines than
+    records. The hot float columns (importance, confidence, last_accessed)
+    live in one (N, 3) float64 array saved as .npy, so reinforcing memories on
+    search never touches the records.
+    """
+    RECORD_FIELDS = ("id", "summary", "tag", "entities", "user_id")
+    IMPORTANCE, CONFIDENCE, LAST_ACCESSED = range(3)
+    COMPACT_RATIO = 2
+
+    def __init__(self, records_path: str, scores_path: str, legacy_paths: tuple = ()):
+        self.records_path = records_path
+        self.scores_path = scores_path
+        # Lines in the records log, including superseded ones
+        self._log_lines = 0
+        self.records: List[Dict[str, Any]] = []
+        self.scores = np.empty((0, 3), dtype="float64")
+        # Set when the score columns changed since the last save
+        self.scores_dirty = False
+        # Memory id -> row, kept in step with records
+        self.id_to_idx: Dict[str, int] = {}
+        self._load(legacy_paths)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get(self, idx: int) -> Dict[str, Any]:
+        """Row ``idx`` as a flat memory dict."""
+        importance, confidence, last_accessed = self.scores[idx].tolist()
+        return {
+            **self.records[idx],
+            "importance": importance,
+            "confidence": confidence,
+            "last_accessed": last_accessed,
+        }
+
+    def rows(self):
+        for idx in range(len(self.records)):
+            yield self.get(idx)
+
+    def extend(self, memories: List[Dict[str, Any]]) -> None:
+        """Append memory dicts (FlattenedMemory.to_dict() shape)."""
+        if not memories:
+            return
+        now = time.time()
+        start = len(self.records)
+        self.records.extend({field: m.get(field) for field in self.RECORD_FIELDS} for m in memories)
+        self.id_to_idx.update((m.get("id"), start + i) for i, m in enumerate(memories))
+        new_scores = np.array([
+            [
+                _as_float(m.get("importance"), 0.1),
+                _as_float(m.get("confidence"), 0.1),
+                _as_float(m.get("last_accessed"), now),
+            ]
+            for m in memories
+        ], dtype="float64")
+        self.scores = np.vstack([self.scores, new_scores])
+
+    def clear(self) -> None:
+        self.records = []
+        self.id_to_idx = {}
+        self.scores = np.empty((0, 3), dtype="float64")
+        self.scores_dirty = False
+
+    def save_records(self) -> None:
+        """Rewrite the records log with one line per record (compaction)."""
+        _atomic_write(self.records_path, lambda f: f.write(self._encode(self.records)))
+        self._log_lines = len(self.records)
+
+    def append_records(self, idxs) -> None:
+        """Append the given rows to the records log, compacting it when it has grown stale."""
+        idxs = list(idxs)
+        if not idxs:
+            return
+        if self._log_lines + len(idxs) > self.COMPACT_RATIO * max(len(self.records), 1):
+            self.save_records()
+            return
+        with open(self.records_path, "ab") as f:
+            f.write(self._encode(self.records[idx] for idx in idxs))
+        self._log_lines += len(idxs)
+
+    @staticmethod
+    def _encode(records) -> bytes:
+        return b"".join(dumps_bytes(record) + b"\n" for record in records)
+
+    def save_scores(self) -> None:
+        self.scores_dirty = False
+        _atomic_write(self.scores_path, lambda f: np.save(f, self.scores))
+
+    def save(self) -> None:
+        self.save_records()
+        self.save_scores()
+
+    def reload_scores(self) -> bool:
+        """Re-read the score columns; False if they no longer match the records."""
+        if not os.path.exists(self.scores_path):
+            return False
+        scores = np.load(self.scores_path)
+        if len(scores) != len(self.records):
+            return False
+        self.scores = scores
+        self.scores_dirty = False
+        return True
+
+    def _load(self, legacy_paths: tuple = ()) -> None:
+        if os.path.exists(self.records_path):
+            torn = False
+            with open(self.records_path, "rb") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = loads(line)
+                    except ValueError:
+                        # A torn final line from an interrupted append
+                        logger.warning("Skipping unreadable memory record in %s", self.records_path)
+                        torn = True
+                        continue
+                    self._log_lines += 1
+                    idx = self.id_to_idx.get(record.get("id"))
+                    if idx is None:
+                        self.id_to_idx[record.get("id")] = len(self.records)
+                        self.records.append(record)
+                    else:
+                        self.records[idx] = record
+            if os.path.exists(self.scores_path):
+                self.scores = np.load(self.scores_path)
+            if len(self.scores) != len(self.records):
+                logger.warning("Memory scores out of sync with records (%s vs %s), resetting scores",
+                               len(self.scores), len(self.records))
+                self.scores = np.tile(np.array([0.1, 0.1, time.time()]), (len(self.records), 1))
+            # Rewrite a stale or damaged log so later appends start on a clean line
+            if torn or self._log_lines > self.COMPACT_RATIO * max(len(self.records), 1):
+                self.save_records()
+            return
+
+        # Convert pickled metadata written by earlier versions
+        for legacy_path in legacy_paths:
+            if not os.path.exists(legacy_path):
+                continue
+            with open(legacy_path, "rb") as f:
+                self.extend(pickle.load(f))
+            # Pickled records were paired with a score array; keep it if it still matches
+            if os.path.exists(self.scores_path):
+                scores = np.load(self.scores_path)
+                if len(scores) == len(self.records):
+                    self.scores = scores
+            self.save()
+            os.remove(legacy_path)
+            logger.info("Converted %s legacy memory records to the records log", len(self.records))
+            return
+
+
+# Managers with unsaved score updates are flushed at interpreter exit
+_live_managers: "weakref.WeakSet[VectorManager]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all() -> None:
+    for manager in list(_live_managers):
+        manager.flush()
+
+
 # ──────────────────────────────────────────────
 # Vector Manager (FAISS + Azure)
 # ──────────────────────────────────────────────
 class VectorManager:
+    """
+    FAISS index plus memory metadata for one user, held in memory.
+
+    Several worker processes may hold a manager for the same user. Every
+    operation runs under a per-user file lock and first checks the index,
+    records and scores files; when another process has rewritten them, the
+    in-memory copy is reloaded before it is read or saved over.
+    """
     SIMILARITY_THRESHOLDS = {
         "duplicate": 0.90,
         "merge": 0.80,
     }
 
+    # HNSW graph parameters: neighbours per node, build/search beam widths
+    HNSW_M = 32
+    HNSW_EF_CONSTRUCTION = 80
+    HNSW_EF_SEARCH = 64
+
+    # Seconds to batch search-time score updates before writing them to disk
+    SCORES_FLUSH_DELAY = 5.0
+
     def __init__(self, user_id: str, base_path="data/faiss"):
         self.user_id = user_id
 
@@ -96,95 +318,201 @@ class VectorManager:
         # Paths
         self.base_path = os.path.join(base_path, user_id)
         os.makedirs(self.base_path, exist_ok=True)
+        # Lives beside the user directory so delete_all never removes a held lock
+        self.lock_path = os.path.join(base_path, f"{user_id}.lock")
         self.index_path = os.path.join(self.base_path, "ltm_faiss.index")
+        self.records_path = os.path.join(self.base_path, "ltm_records.jsonl")
+        self.scores_path = os.path.join(self.base_path, "ltm_scores.npy")
+        # Pickled formats written by earlier versions; converted on load
+        self.legacy_records_path = os.path.join(self.base_path, "ltm_records.pkl")
         self.meta_path = os.path.join(self.base_path, "ltm_meta.pkl")
+        self.embedding_cache = EmbeddingCache(
+            os.path.join(self.base_path, "emb_cache.sqlite"), self.embedding_model
+        )
 
         # Load existing data
-        self.index = self._load_index()
-        self.metadata = self._load_metadata()
+        with self._file_lock():
+            self.index = self._load_index()
+            self.store = MemoryStore(
+                self.records_path, self.scores_path,
+                legacy_paths=(self.legacy_records_path, self.meta_path),
+            )
+            # Files as last read or written by this process; see _sync
+            self._disk_state = self._stat_files()
+
+        # Bumped whenever the stored memories change, so callers can key caches on it
+        self.version = 0
+
+        # Guards the index, the store and the flush timer. The pooled manager is
+        # shared by request threads (search) and the LTM loop (add), and FAISS ids
+        # must never be visible before their store rows exist. Embedding API
+        # calls happen outside it.
+        self._lock = threading.RLock()
+        # Write-back state for search-time score updates
+        self._flush_timer = None
+        _live_managers.add(self)
 
     # ──────────────────────────────
     # Internal persistence helpers
     # ──────────────────────────────
-    def _load_index(self):
-        if os.path.exists(self.index_path):
-            return faiss.read_index(self.index_path)
-        return None
+    @contextmanager
+    def _file_lock(self, shared: bool = False):
+        """Hold the per-user lock shared with other worker processes."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _stat_files(self):
+        """(inode, mtime, size) of the index, records and scores files; None if missing."""
+        state = []
+        for path in (self.index_path, self.records_path, self.scores_path):
+            try:
+                st = os.stat(path)
+                state.append((st.st_ino, st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                state.append(None)
+        return tuple(state)
+
+    def _sync(self):
+        """
+        Reload whatever another process changed on disk since we last read or wrote it.
 
-    def _load_metadata(self):
-        if os.path.exists(self.meta_path):
-            with open(self.meta_path, "rb") as f:
-                return pickle.load(f)
-        return []
+        Call with self._lock and the file lock held. Unsaved score updates are
+        dropped when the scores were rewritten elsewhere.
+        """
+        state = self._stat_files()
+        if state == self._disk_state:
+            return
+        if state[:2] == self._disk_state[:2] and self.store.reload_scores():
+            # Only search-time score updates; the index and records still match
+            self._disk_state = state
+            return
+        logger.debug("Reloading memories for user %s changed by another process", self.user_id)
+        self.index = self._load_index()
+        self.store = MemoryStore(self.records_path, self.scores_path)
+        self._disk_state = self._stat_files()
+        self.version += 1
+
+    def _new_index(self, dim: int):
+        """
+        Create an HNSW index: sub-linear approximate search instead of a flat scan.
+
+        Vectors are L2-normalized, so the inner-product score is cosine similarity.
+        Stored vectors are float16 (scalar quantizer), halving index memory;
+        queries stay float32 and are compared against the decoded vectors.
+        """
+        index = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_fp16, self.HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = self.HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = self.HNSW_EF_SEARCH
+        return index
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return None
+        index = faiss.read_index(self.index_path)
+        if isinstance(index, faiss.IndexHNSWSQ) and index.metric_type == faiss.METRIC_INNER_PRODUCT:
+            index.hnsw.efSearch = self.HNSW_EF_SEARCH
+            return index
+
+        # Migrate older indexes (flat, L2 or float32 HNSW); ids are positional, so re-adding
+        # the normalized vectors in order keeps metadata aligned
+        migrated = self._new_index(index.d)
+        if index.ntotal:
+            vectors = np.ascontiguousarray(index.reconstruct_n(0, index.ntotal), dtype="float32")
+            faiss.normalize_L2(vectors)
+            migrated.add(vectors)
+        faiss.write_index(migrated, self.index_path)
+        logger.info("Migrated FAISS index for user %s to fp16 cosine HNSW (%s vectors)", self.user_id, index.ntotal)
+        return migrated
 
     def _save_index(self):
         if self.index:
             faiss.write_index(self.index, self.index_path)
 
-    def _save_metadata(self):
-        with open(self.meta_path, "wb") as f:
-            pickle.dump(self.metadata, f)
-
-    def _l2_to_similarity(self, distance: float, max_distance: float = 1000.0) -> float:
-        normalized = min(distance / max_distance, 1.0)
-        return 1.0 - normalized
+    def _schedule_flush(self):
+        """Mark the score columns dirty and write them back after SCORES_FLUSH_DELAY."""
+        with self._lock:
+            self.store.scores_dirty = True
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.SCORES_FLUSH_DELAY, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self):
+        """Write pending score updates to disk."""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self.store.scores_dirty:
+                return
+            try:
+                with self._file_lock():
+                    self._sync()
+                    if self.store.scores_dirty:
+                        self.store.save_scores()
+                        self._disk_state = self._stat_files()
+            except Exception as e:
+                logger.error("Failed to flush memory scores for user %s: %s", self.user_id, e)
 
     # ──────────────────────────────
     # Embeddings
     # ──────────────────────────────
     def embed_query(self, query):
+        """
+        Embed a string or a list of strings, returning a (n, dim) float32 array.
+
+        Cached texts are served from the embedding cache; the rest are sent to
+        the API in a single batched request.
+        """
         try:
-            response = self.client.embeddings.create(model=self.embedding_model, input=query)
-            if isinstance(query, list):
-                embeddings = np.array([d.embedding for d in response.data]).astype("float32")
-            else:
-                embeddings = np.array([response.data[0].embedding]).astype("float32")
+            texts = query if isinstance(query, list) else [query]
+            cached = self.embedding_cache.get_many(texts)
+            missing = list(dict.fromkeys(t for t in texts if t not in cached))
+            if missing:
+                response = self.client.embeddings.create(model=self.embedding_model, input=missing)
+                fetched = {
+                    text: np.asarray(d.embedding, dtype="float32")
+                    for text, d in zip(missing, response.data)
+                }
+                self.embedding_cache.set_many(fetched)
+                cached.update(fetched)
+            embeddings = np.array([cached[t] for t in texts], dtype="float32")
+            # Unit vectors: inner product == cosine similarity (also undoes
+            # the float16 rounding of cached vectors)
+            faiss.normalize_L2(embeddings)
             return embeddings
         except Exception as e:
-            print(f"❌ Embedding error: {e}")
+            logger.error("Embedding error: %s", e)
             return None
 
     # ──────────────────────────────
     # Importance & Confidence models
     # ──────────────────────────────
-    def _update_importance(self, memory: FlattenedMemory, recalled: bool = True, alpha: float = 0.08):
+    def _update_importance(self, idxs: np.ndarray, days_since: np.ndarray, recalled: bool = True, alpha: float = 0.08):
         """Increase importance with diminishing returns."""
-        imp = memory.get("importance", 0.1)
-        now = time.time()
+        imp = self.store.scores[idxs, MemoryStore.IMPORTANCE]
 
         # Nonlinear reinforcement: harder to reach 1
         if recalled:
-            imp += alpha * (1 - imp) ** 2  # slows down near 1
-        # Robust handling of last_accessed: ensure it's a float timestamp
-        last_accessed = memory.get("last_accessed", now)
-        try:
-            last_accessed = float(last_accessed)
-        except (TypeError, ValueError):
-            last_accessed = now
+            imp = imp + alpha * (1 - imp) ** 2  # slows down near 1
         # Optional: slow decay over time
-        days_since = (now - last_accessed) / 86400
         decay_rate = 0.005
-        imp *= math.exp(-decay_rate * days_since)
-        memory["importance"] = min(0.98, max(0.05, imp))
-        memory["last_accessed"] = now
-        return memory
+        imp *= np.exp(-decay_rate * days_since)
+        self.store.scores[idxs, MemoryStore.IMPORTANCE] = np.clip(imp, 0.05, 0.98)
 
-    def _update_confidence(self, memory: FlattenedMemory, match_score: float = 0.8, confirmed: bool = True):
+    def _update_confidence(self, idxs: np.ndarray, days_since: np.ndarray, match_score=0.8, confirmed: bool = True):
         """Adjust confidence gradually based on verification & decay."""
-        now = time.time()
-        conf = memory.get("confidence", 0.1)
-        last = memory.get("last_accessed", now)
-
-        # Ensure last is a float timestamp, handle string or other types robustly
-        try:
-            last = float(last)
-        except (TypeError, ValueError):
-            last = now
-
-        dt_days = (now - last) / 86400
+        conf = self.store.scores[idxs, MemoryStore.CONFIDENCE]
 
         # Natural decay
-        conf *= math.exp(-0.005 * dt_days)
+        conf = conf * np.exp(-0.005 * days_since)
 
         # Reinforce with evidence
         if confirmed:
@@ -192,10 +520,19 @@ class VectorManager:
         else:
             conf *= (1 - 0.05 * (1 - match_score))  # penalize mismatch
 
-        conf = max(0.05, min(0.98, conf))
-        memory["confidence"] = conf
-        memory["last_accessed"] = now
-        return memory
+        self.store.scores[idxs, MemoryStore.CONFIDENCE] = np.clip(conf, 0.05, 0.98)
+
+    def _reinforce(self, idxs, match_score=0.8):
+        """Apply recall reinforcement to the given rows in one vectorized pass."""
+        idxs = np.asarray(idxs, dtype="int64")
+        if idxs.size == 0:
+            return
+        now = time.time()
+        # Measure decay before either update touches last_accessed
+        days_since = (now - self.store.scores[idxs, MemoryStore.LAST_ACCESSED]) / 86400.0
+        self._update_importance(idxs, days_since)
+        self._update_confidence(idxs, days_since, np.asarray(match_score, dtype="float64"))
+        self.store.scores[idxs, MemoryStore.LAST_ACCESSED] = now
 
     # ──────────────────────────────
     # Core memory operations
@@ -208,85 +545,119 @@ class VectorManager:
                 flattened.append(flattened_mem)
 
         if not flattened:
-            print("⚠️ No memories to store.")
+            logger.warning("No memories to store.")
             return []
 
         texts = [m.summary for m in flattened]
         embeddings = self.embed_query(texts)
         if embeddings is None:
-            print("❌ Failed to embed memories.")
+            logger.error("Failed to embed memories.")
             return []
 
-        if self.index is None:
-            self.index = faiss.IndexFlatL2(embeddings.shape[1])
-
-        new_memories, merged, skipped = [], 0, 0
-
-        for flat_mem, embedding in zip(flattened, embeddings):
-            if len(self.metadata) > 0:
-                distances, indices = self.index.search(embedding.reshape(1, -1), k=1)
-                distance = distances[0][0]
-                similarity = self._l2_to_similarity(distance)
-
-                if similarity >= self.SIMILARITY_THRESHOLDS["duplicate"]:
-                    skipped += 1
-                    continue
-                elif similarity >= self.SIMILARITY_THRESHOLDS["merge"]:
-                    idx = indices[0][0]
-                    existing = self.metadata[idx]
-                    existing = self._update_importance(existing)
-                    existing = self._update_confidence(existing, similarity)
-                    existing["entities"] = list(
-                        set(existing.get("entities", []) + flat_mem.entities)
-                    )
-                    merged += 1
-                    continue
-
-            new_memories.append((flat_mem, embedding))
-        if new_memories:
-            new_embs = np.array([e for _, e in new_memories]).astype("float32")
-            self.index.add(new_embs)
-            self.metadata.extend([m.to_dict() for m, _ in new_memories])
-            self._save_index()
-            self._save_metadata()
-            print(f"✓ Stored {len(new_memories)} new memories ({merged} merged, {skipped} skipped)")
-        else:
-            self._save_metadata()
-        return [m for m, _ in new_memories]
+        with self._lock, self._file_lock():
+            self._sync()
+            if self.index is None:
+                self.index = self._new_index(embeddings.shape[1])
+
+            new_memories, merged_idxs, skipped = [], [], 0
+
+            # Probe all new embeddings against the stored index in one batched search
+            if len(self.store) > 0:
+                scores, neighbours = self.index.search(embeddings, 1)
+                nearest = zip(scores[:, 0].tolist(), neighbours[:, 0].tolist())
+            else:
+                nearest = ((None, -1) for _ in flattened)
+
+            for flat_mem, embedding, (similarity, idx) in zip(flattened, embeddings, nearest):
+                if idx != -1:
+                    if similarity >= self.SIMILARITY_THRESHOLDS["duplicate"]:
+                        skipped += 1
+                        continue
+                    elif similarity >= self.SIMILARITY_THRESHOLDS["merge"]:
+                        self._reinforce([idx], similarity)
+                        existing = self.store.records[idx]
+                        existing["entities"] = list(
+                            set((existing.get("entities") or []) + flat_mem.entities)
+                        )
+                        merged_idxs.append(idx)
+                        continue
+
+                new_memories.append((flat_mem, embedding))
+            changed_idxs = list(dict.fromkeys(merged_idxs))
+            # Another process's delete_all may have removed the directory
+            os.makedirs(self.base_path, exist_ok=True)
+            if new_memories:
+                new_embs = np.array([e for _, e in new_memories]).astype("float32")
+                self.index.add(new_embs)
+                start = len(self.store)
+                self.store.extend([m.to_dict() for m, _ in new_memories])
+                changed_idxs.extend(range(start, len(self.store)))
+                self._save_index()
+                logger.info("Stored %s new memories (%s merged, %s skipped)", len(new_memories), len(merged_idxs), skipped)
+            if changed_idxs:
+                self.store.append_records(changed_idxs)
+                self.store.save_scores()
+                self.version += 1
+            self._disk_state = self._stat_files()
+            return [m for m, _ in new_memories]
 
     # ──────────────────────────────
     # Search & Reinforcement
     # ──────────────────────────────
-    def search(self, query: str, top_k: int = 10):
-        if not self.index or not self.metadata:
+    def search(self, query: str, top_k: int = 10, embeddings: Optional[np.ndarray] = None):
+        """Search by ``query``, or by its precomputed (1, dim) ``embeddings`` when given."""
+        with self._lock, self._file_lock(shared=True):
+            self._sync()
+        if not self.index or not len(self.store):
             return []
 
-        embeddings = self.embed_query(query)
+        if embeddings is None:
+            embeddings = self.embed_query(query)
         if embeddings is None:
             return []
 
-        distances, indices = self.index.search(embeddings, top_k)
-        results = []
-        for idx, dist in zip(indices[0], distances[0]):
-            if idx == -1:
-                continue
-            mem = self.metadata[idx]
-            similarity = self._l2_to_similarity(dist)
-            mem = self._update_importance(mem)
-            mem = self._update_confidence(mem, similarity)
-            results.append({**mem, "similarity": similarity, "index": idx})
-
-        self._save_metadata()
+        with self._lock:
+            with self._file_lock(shared=True):
+                self._sync()
+            if not self.index:
+                return []
+            distances, indices = self.index.search(embeddings, top_k)
+            found = indices[0] != -1
+            idxs, similarities = indices[0][found], distances[0][found]
+            self._reinforce(idxs, similarities)
+
+            results = [
+                {**self.store.get(idx), "similarity": similarity, "index": idx}
+                for idx, similarity in zip(idxs.tolist(), similarities.tolist())
+            ]
+
+            # Only the float columns changed; write them back off the read path
+            self._schedule_flush()
         return results
 
+    def get_memories_by_ids(self, memory_ids: List[str]) -> List[Dict[str, Any]]:
+        """Look up several memories by id and reinforce them together."""
+        with self._lock:
+            with self._file_lock(shared=True):
+                self._sync()
+            id_to_idx = self.store.id_to_idx
+            idxs = list(dict.fromkeys(id_to_idx[m] for m in memory_ids if m in id_to_idx))
+            if not idxs:
+                return []
+            self._reinforce(idxs)
+            self._schedule_flush()
+            return [{**self.store.get(idx), "index": idx} for idx in idxs]
+
     def get_memory_by_id(self, memory_id: str):
-        for idx, memory in enumerate(self.metadata):
-            if memory.get("id") == memory_id:
-                self.metadata[idx] = self._update_importance(memory)
-                self.metadata[idx] = self._update_confidence(memory)
-                self._save_metadata()
-                return {**memory, "index": idx}
-        return None
+        with self._lock:
+            with self._file_lock(shared=True):
+                self._sync()
+            idx = self.store.id_to_idx.get(memory_id)
+            if idx is None:
+                return None
+            self._reinforce([idx])
+            self._schedule_flush()
+            return {**self.store.get(idx), "index": idx}
 
     # ──────────────────────────────────────────────
     # Export to Excel
@@ -303,8 +674,8 @@ class VectorManager:
         """
         import os
 
-        if not self.metadata:
-            print(f"⚠️ No memories to export for user {self.user_id}")
+        if not len(self.store):
+            logger.warning("No memories to export for user %s", self.user_id)
             return None
 
         # Determine output path and ensure directory exists
@@ -318,7 +689,11 @@ class VectorManager:
 
             # Convert metadata to DataFrame
             df_data = []
-            for memory in self.metadata:
+            with self._lock:
+                with self._file_lock(shared=True):
+                    self._sync()
+                memories = list(self.store.rows())
+            for memory in memories:
                 df_data.append({
                     "ID": memory.get("id", ""),
                     "Summary": memory.get("summary", ""),
@@ -353,19 +728,19 @@ class VectorManager:
                     # Freeze header row
                     worksheet.freeze_panes = 'A2'
             except Exception as ex:
-                print(f"❌ Error writing Excel file: {ex}")
+                logger.error("Error writing Excel file: %s", ex)
                 return None
 
             # Double-check if file really exists
             if os.path.exists(output_path):
-                print(f"✓ Exported {len(df_data)} memories to {output_path}")
+                logger.info("Exported %s memories to %s", len(df_data), output_path)
                 return output_path
             else:
-                print(f"❌ Excel file was not created at: {output_path}")
+                logger.error("Excel file was not created at: %s", output_path)
                 return None
 
         except Exception as e:
-            print(f"❌ Excel export failed: {e}")
+            logger.error("Excel export failed: %s", e)
             return None
     
     def _unix_to_iso(self, unix_timestamp: float) -> str:
@@ -384,36 +759,40 @@ class VectorManager:
             True if deletion was successful, False otherwise
         """
         try:
-            # Clear in-memory data
-            self.index = None
-            self.metadata = []
-            
-            # Delete index file if it exists
-            if os.path.exists(self.index_path):
-                os.remove(self.index_path)
-                print(f"✓ Deleted FAISS index: {self.index_path}")
-            
-            # Delete metadata file if it exists
-            if os.path.exists(self.meta_path):
-                os.remove(self.meta_path)
-                print(f"✓ Deleted metadata file: {self.meta_path}")
-            
-            # Delete the entire user directory if it exists and is empty
-            if os.path.exists(self.base_path):
+            # Hold the file lock throughout so no other process saves over the deletion
+            with self._lock, self._file_lock():
+                # Clear in-memory data; flushing an empty store just cancels pending writes
+                self.index = None
+                self.store.clear()
+                self.flush()
+                self.embedding_cache.close()
+                self.version += 1
+
+                # Delete the index and metadata files (and any unconverted legacy
+                # pickles); a missing file is simply skipped
+                for path in (self.index_path, self.records_path, self.scores_path,
+                             self.legacy_records_path, self.meta_path):
+                    try:
+                        os.remove(path)
+                        logger.info("Deleted FAISS data file: %s", path)
+                    except FileNotFoundError:
+                        pass
+
+                # Delete the user directory; rmdir only succeeds when it is empty
                 try:
-                    # Try to remove directory (will only work if empty)
                     os.rmdir(self.base_path)
-                    print(f"✓ Deleted user directory: {self.base_path}")
+                    logger.info("Deleted user directory: %s", self.base_path)
+                except FileNotFoundError:
+                    pass
                 except OSError:
-                    # Directory not empty or other error, try to remove all contents
+                    # Directory not empty (e.g. the embedding cache), remove all contents
                     shutil.rmtree(self.base_path)
-                    print(f"✓ Deleted user directory and all contents: {self.base_path}")
+                    logger.info("Deleted user directory and all contents: %s", self.base_path)
+                self._disk_state = self._stat_files()
             
-            print(f"✓ Successfully deleted all FAISS data for user: {self.user_id}")
+            logger.info("Successfully deleted all FAISS data for user: %s", self.user_id)
             return True
             
         except Exception as e:
-            print(f"❌ Error deleting FAISS data for user {self.user_id}: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error deleting FAISS data for user %s: %s", self.user_id, e)
             return False
\ No newline at end of file
@@ -1,30 +1,109 @@
 import asyncio
+import logging
 import threading
-from typing import List, Dict, Any
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
 
 from autogen_core.models import AssistantMessage, UserMessage
+from brain_core.event_loop import new_event_loop
 from memory.stm import STM
 from memory.ltm import MemoryService
 
+logger = logging.getLogger(__name__)
+
+# Runs the LTM vector search alongside the STM fetch in get_messages
+_io_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="memory-io")
+
+# Long-lived loop (on its own thread) that runs every background LTM move,
+# created lazily on first use
+_ltm_loop: Optional[asyncio.AbstractEventLoop] = None
+_ltm_loop_lock = threading.Lock()
+_ltm_semaphore: Optional[asyncio.Semaphore] = None
+# Caps concurrent LTM moves so bursts don't pile onto FAISS/Neo4j/the LLM
+LTM_MAX_CONCURRENCY = 8
+# STM size that triggers a move to LTM, and the number of latest messages kept in STM
+STM_MOVE_THRESHOLD = 30
+STM_KEEP = 15
+
+
+def _get_ltm_loop() -> asyncio.AbstractEventLoop:
+    """Get the shared background loop for LTM processing."""
+    global _ltm_loop
+    if _ltm_loop is None:
+        with _ltm_loop_lock:
+            if _ltm_loop is None:
+                loop = new_event_loop()
+                threading.Thread(target=loop.run_forever, name="ltm-loop", daemon=True).start()
+                _ltm_loop = loop
+    return _ltm_loop
+
+
+async def _run_limited(coro):
+    """Run ``coro`` on the LTM loop under the shared concurrency limit."""
+    global _ltm_semaphore
+    if _ltm_semaphore is None:
+        # Created on the LTM loop itself, the only loop that awaits it
+        _ltm_semaphore = asyncio.Semaphore(LTM_MAX_CONCURRENCY)
+    async with _ltm_semaphore:
+        return await coro
+
 
 class MemoryManager:
     """Manages conversation memory by passing directly to STM for SQL storage"""
 
+    # Managers kept alive by get(), least recently used evicted first
+    POOL_MAX = 128
+    _pool: "OrderedDict[str, MemoryManager]" = OrderedDict()
+    _pool_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, user_id: str) -> "MemoryManager":
+        """
+        Get the shared MemoryManager for ``user_id``.
+
+        Building one loads the user's FAISS index and sets up the STM and LTM
+        clients, so chat requests reuse a pooled instance instead.
+        """
+        with cls._pool_lock:
+            manager = cls._pool.get(user_id)
+            if manager is not None:
+                cls._pool.move_to_end(user_id)
+                return manager
+            manager = cls(user_id=user_id)
+            cls._pool[user_id] = manager
+            while len(cls._pool) > cls.POOL_MAX:
+                cls._pool.popitem(last=False)
+            return manager
+
+    @classmethod
+    def evict(cls, user_id: str) -> None:
+        """Drop ``user_id``'s pooled manager, if any."""
+        with cls._pool_lock:
+            cls._pool.pop(user_id, None)
+
     def __init__(self, user_id: str = None):
         self.user_id = user_id
+        # Serializes add_messages so concurrent turns can't move the same messages twice
+        self._lock = threading.Lock()
+        # Messages in STM, tracked locally so add_messages only reads STM when
+        # a move to LTM is due; None means unknown (count on next use)
+        self._stm_count: Optional[int] = None
+        # True while a move to LTM is in flight, so later turns don't start another
+        self._moving = False
 
         # Initialize STM (SQL Memory) for persistent storage
         try:
             self.stm = STM()
         except Exception as e:
-            print(f"Warning: Could not initialize STM storage: {e}")
+            logger.warning("Could not initialize STM storage: %s", e)
             self.stm = None
 
         # Initialize LTM (Long-Term Memory) placeholder
         try:
             self.ltm = MemoryService(user_id=self.user_id)
         except Exception as e:
-            print(f"Warning: Could not initialize LTM: {e}")
+            logger.warning("Could not initialize LTM: %s", e)
             self.ltm = None
 
     def add_messages(self, messages: List[Dict[str, Any]]):
@@ -37,37 +116,70 @@ class MemoryManager:
         if not self.stm or not self.user_id:
             return
 
+        with self._lock:
+            self._add_messages(messages_to_store)
+
+    def _add_messages(self, messages_to_store: List[Dict[str, Any]]):
         try:
-            current_messages = self.stm.get_messages(
-                self.user_id, limit=100) if self.stm else []
-            all_messages = current_messages + messages_to_store
-            if len(all_messages) >= 30:
-                ltm_messages = all_messages[:15]
-                stm_messages = all_messages[-15:]
-
-                if self.ltm and ltm_messages:
-                    print(f"✓ Moved first 10 messages to LTM, kept last 10 in STM")
-
-                    async def run_ltm_task():
-                        try:
-                            await self.ltm.process_conversation(ltm_messages)
-                            self.stm.clear_messages(self.user_id)
-                            self.stm.save_messages(self.user_id, stm_messages)
-                        except Exception as e:
-                            print(f"⚠️ LTM processing failed: {e}")
-
-                    def start_background_ltm():
-                        try:
-                            asyncio.run(run_ltm_task())
-                        except Exception as e:
-                            print(f"⚠️ Background LTM thread error: {e}")
-                    threading.Thread(
-                        target=start_background_ltm, daemon=True).start()
-            else:
+            if self._stm_count is None:
+                self._stm_count = self.stm.count_messages(self.user_id)
+            if self._moving or self._stm_count + len(messages_to_store) < STM_MOVE_THRESHOLD:
                 self.stm.save_messages(self.user_id, messages_to_store)
+                self._stm_count += len(messages_to_store)
+                return
+
+            # A move looks due, but the local count can be stale (another worker
+            # may have added or moved rows); confirm against STM before deciding
+            count = self.stm.count_messages(self.user_id)
+            self.stm.save_messages(self.user_id, messages_to_store)
+            self._stm_count = count + len(messages_to_store)
+            if self._stm_count < STM_MOVE_THRESHOLD or not self.ltm:
+                return
+
+            all_messages = self.stm.get_messages(self.user_id, limit=self._stm_count)
+            # Move everything but the latest STM_KEEP, so a backlog past the
+            # threshold is moved to LTM rather than dropped
+            ltm_messages = all_messages[:-STM_KEEP]
+            if not ltm_messages:
+                return
+            logger.info("Moving %s messages to LTM, keeping the last %s in STM", len(ltm_messages), STM_KEEP)
+
+            async def run_ltm_task():
+                try:
+                    await self.ltm.process_conversation(ltm_messages)
+                    # Off the shared loop so other users' LTM moves keep running
+                    await asyncio.to_thread(self._trim_stm, ltm_messages)
+                except Exception as e:
+                    logger.warning("LTM processing failed: %s", e)
+                finally:
+                    self._moving = False
+
+            # Until the move finishes, later turns only append to STM
+            self._moving = True
+            try:
+                asyncio.run_coroutine_threadsafe(_run_limited(run_ltm_task()), _get_ltm_loop())
+            except Exception:
+                self._moving = False
+                raise
 
         except Exception as e:
-            print(f"Warning: Could not save: {e}")
+            logger.warning("Could not save: %s", e)
+            self._stm_count = None
+
+    def _trim_stm(self, moved: List[Dict[str, Any]]):
+        """Remove ``moved`` (the oldest STM rows) from STM, keeping everything saved after them."""
+        with self._lock:
+            try:
+                rows = self.stm.get_messages(self.user_id, limit=self.stm.count_messages(self.user_id))
+                key = lambda m: (m.get("role"), m.get("content"))
+                if [key(m) for m in rows[:len(moved)]] != [key(m) for m in moved]:
+                    logger.warning("STM changed during the LTM move for user %s; leaving it as is", self.user_id)
+                    return
+                self.stm.clear_messages(self.user_id)
+                self.stm.save_messages(self.user_id, rows[len(moved):])
+            finally:
+                # STM was rewritten (or not); recount on the next turn
+                self._stm_count = None
 
     def search_memories(self, user_message: str, top_k: int = 10) -> Dict:
         """Search memories using the MemoryRetriever"""
@@ -79,19 +191,25 @@ class MemoryManager:
         """Get messages directly from STM (SQL storage)"""
         if self.stm and self.user_id:
             try:
+                # The two lookups are independent network calls; overlap them
+                context_future = _io_pool.submit(self.search_memories, message)
                 stm_messages = self.stm.get_messages(self.user_id)
-                context_string = self.search_memories(message)
-                messages = []
-                for message in stm_messages:
-                    if message.get("role") == "user":
-                        messages.append(UserMessage(
-                            content=message.get("content"), source="user"))
-                    else:
-                        messages.append(AssistantMessage(content=message.get(
-                            "content"), source=message.get("role")))
-                return context_string, messages
+                messages = [
+                    UserMessage(content=m.get("content"), source="user")
+                    if m.get("role") == "user"
+                    else AssistantMessage(content=m.get("content"), source=m.get("role"))
+                    for m in stm_messages
+                ]
+            except Exception as e:
+                logger.warning("Could not get messages: %s", e)
+                return "", []
+            try:
+                context = context_future.result()
             except Exception as e:
-                print(f"Warning: Could not get messages: {e}")
+                # A failed memory search shouldn't cost the turn its STM history
+                logger.warning("Could not search memories: %s", e)
+                context = ""
+            return context, messages
         return "", []
 
     def export_to_excel(self, output_path: str):
@@ -107,42 +225,48 @@ class MemoryManager:
         Returns:
             True if all deletions were successful, False otherwise
         """
-        success_count = 0
-        total_operations = 2
-        
-        print(f"\n🗑️  Starting complete deletion for user: {self.user_id}")
-        print("=" * 60)
-        
-        # 1. Delete STM (Short-Term Memory) - conversation history
-        if self.stm and self.user_id:
-            try:
-                self.stm.clear_messages(self.user_id)
-                print("✓ STM conversation history deleted successfully")
-                success_count += 1
-            except Exception as e:
-                print(f"❌ Error deleting STM data: {e}")
-        else:
-            print("⚠️  STM not initialized, skipping STM deletion")
-            total_operations -= 1
-        
-        # 2. Delete LTM (Long-Term Memory) - vectors, graph, tags
-        if self.ltm:
-            try:
-                if self.ltm.delete_all():
-                    print("✓ LTM data deleted successfully")
-                    success_count += 1
-                else:
-                    print("❌ Failed to delete some LTM data")
-            except Exception as e:
-                print(f"❌ Error deleting LTM data: {e}")
-        else:
-            print("⚠️  LTM not initialized, skipping LTM deletion")
-            total_operations -= 1
-        
-        print("=" * 60)
+        logger.info("Starting complete deletion for user: %s", self.user_id)
+
+        # The two stores are independent network/disk deletions; overlap them
+        ltm_future = _io_pool.submit(self._delete_ltm)
+        results = [self._delete_stm(), ltm_future.result()]
+
+        # None marks a store that wasn't initialized and was skipped
+        results = [r for r in results if r is not None]
+        success_count, total_operations = sum(results), len(results)
+
         if success_count == total_operations and total_operations > 0:
-            print(f"✅ Successfully deleted all data for user: {self.user_id}")
+            logger.info("Successfully deleted all data for user: %s", self.user_id)
+            MemoryManager.evict(self.user_id)
             return True
         else:
-            print(f"⚠️  Deleted {success_count}/{total_operations} memory systems for user: {self.user_id}")
+            logger.warning("Deleted %s/%s memory systems for user: %s", success_count, total_operations, self.user_id)
+            return False
+
+    def _delete_stm(self) -> Optional[bool]:
+        """Delete STM (Short-Term Memory) - conversation history"""
+        if not self.stm or not self.user_id:
+            logger.warning("STM not initialized, skipping STM deletion")
+            return None
+        try:
+            self.stm.clear_messages(self.user_id)
+            self._stm_count = 0
+            logger.info("STM conversation history deleted successfully")
+            return True
+        except Exception as e:
+            logger.error("Error deleting STM data: %s", e)
             return False
+
+    def _delete_ltm(self) -> Optional[bool]:
+        """Delete LTM (Long-Term Memory) - vectors, graph, tags"""
+        if not self.ltm:
+            logger.warning("LTM not initialized, skipping LTM deletion")
+            return None
+        try:
+            if self.ltm.delete_all():
+                logger.info("LTM data deleted successfully")
+                return True
+            logger.error("Failed to delete some LTM data")
+        except Exception as e:
+            logger.error("Error deleting LTM data: %s", e)
+        return False
@@ -1,24 +1,177 @@
 """
 STM (Short-Term Memory) - Supabase storage for conversation history
 """
-from typing import List, Dict, Any
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from brain_core.config import Config
 from brain_core.sup_extractor import supabase_service
 
+logger = logging.getLogger(__name__)
+
+
+class _UserBuffer:
+    """Recent messages for one user plus the writes not yet sent to Supabase."""
+
+    def __init__(self, maxlen: int):
+        # Held across the Supabase calls below so writes land in order
+        self.lock = threading.Lock()
+        # None until loaded from Supabase; then a mirror of the latest rows
+        self.messages: Optional[deque] = None
+        self.maxlen = maxlen
+        self.pending: List[Dict[str, Any]] = []
+
 
 class STM:
-    """Supabase storage for messages"""
+    """
+    Supabase storage for messages.
+
+    With Config.STM_WRITE_BEHIND, saves are buffered per user and written by a
+    background flusher every STM_FLUSH_INTERVAL_MS, and reads are served from
+    the buffer once it has been loaded. The buffer is per process, so this
+    assumes a user's requests reach the same worker.
+    """
+
+    # Messages mirrored per user; covers the largest get_messages() limit used
+    BUFFER_SIZE = 100
+    # Users with a buffer; the least recently used clean buffers are dropped past this
+    USERS_MAX = 1024
+
+    _buffers: "OrderedDict[str, _UserBuffer]" = OrderedDict()
+    _buffers_lock = threading.Lock()
+    _flusher: Optional[threading.Thread] = None
 
     def __init__(self):
         self.table_name = "conversation_history"
+        self.write_behind = Config.STM_WRITE_BEHIND
 
     def save_messages(self, user_id: str, messages: List[Dict[str, Any]]):
         """Save chat messages to Supabase safely."""
-        supabase_service.save_messages(user_id, messages, self.table_name)
+        if not self.write_behind:
+            supabase_service.save_messages(user_id, messages, self.table_name)
+            return
+        if not messages:
+            return
+        buffer = self._buffer(user_id)
+        with buffer.lock:
+            for message in messages:
+                message = self._stamped(message)
+                buffer.pending.append(message)
+                if buffer.messages is not None:
+                    buffer.messages.append(message)
+        STM._start_flusher()
 
     def get_messages(self, user_id: str, limit: int = 100) -> List[Dict[str, Any]]:
         """Get messages from Supabase"""
-        return supabase_service.get_messages(user_id, limit, self.table_name)
+        if not self.write_behind or limit > self.BUFFER_SIZE:
+            if self.write_behind:
+                self.flush(user_id)
+            return supabase_service.get_messages(user_id, limit, self.table_name)
+        buffer = self._buffer(user_id)
+        with buffer.lock:
+            if buffer.messages is None:
+                # Send pending writes first so the load sees them
+                self._flush_locked(user_id, buffer)
+                rows = supabase_service.get_messages(user_id, self.BUFFER_SIZE, self.table_name)
+                buffer.messages = deque(rows, maxlen=buffer.maxlen)
+            messages = list(buffer.messages)
+        return [dict(m) for m in messages[-limit:]] if limit > 0 else []
+
+    def count_messages(self, user_id: str) -> int:
+        """Count stored messages for a user"""
+        if self.write_behind:
+            buffer = self._buffer(user_id)
+            with buffer.lock:
+                if buffer.messages is not None and len(buffer.messages) < buffer.maxlen:
+                    return len(buffer.messages)
+                self._flush_locked(user_id, buffer)
+        return supabase_service.count_messages(user_id, self.table_name)
 
     def clear_messages(self, user_id: str):
         """Clear messages for a user"""
+        if self.write_behind:
+            buffer = self._buffer(user_id)
+            with buffer.lock:
+                buffer.pending.clear()
+                buffer.messages = deque(maxlen=buffer.maxlen)
+                supabase_service.clear_messages(user_id, self.table_name)
+            return
         supabase_service.clear_messages(user_id, self.table_name)
+
+    # ──────────────────────────────
+    # Write-behind buffering
+    # ──────────────────────────────
+    def flush(self, user_id: str) -> None:
+        """Write ``user_id``'s pending messages to Supabase now."""
+        with STM._buffers_lock:
+            buffer = STM._buffers.get(user_id)
+        if buffer is not None:
+            with buffer.lock:
+                self._flush_locked(user_id, buffer)
+
+    def _flush_locked(self, user_id: str, buffer: _UserBuffer) -> None:
+        if buffer.pending:
+            pending, buffer.pending = buffer.pending, []
+            supabase_service.save_messages(user_id, pending, self.table_name)
+
+    @classmethod
+    def flush_all(cls) -> None:
+        """Write every user's pending messages (flusher loop and interpreter exit)."""
+        with cls._buffers_lock:
+            user_ids = list(cls._buffers)
+        stm = cls()
+        for user_id in user_ids:
+            try:
+                stm.flush(user_id)
+            except Exception as e:
+                logger.error("STM flush failed for user %s: %s", user_id, e)
+
+    @classmethod
+    def _start_flusher(cls) -> None:
+        if cls._flusher is not None:
+            return
+        with cls._buffers_lock:
+            if cls._flusher is None:
+                cls._flusher = threading.Thread(target=cls._flush_loop, name="stm-flusher", daemon=True)
+                cls._flusher.start()
+                atexit.register(cls.flush_all)
+
+    @classmethod
+    def _flush_loop(cls) -> None:
+        interval = Config.STM_FLUSH_INTERVAL_MS / 1000
+        while True:
+            time.sleep(interval)
+            cls.flush_all()
+
+    def _buffer(self, user_id: str) -> _UserBuffer:
+        with STM._buffers_lock:
+            buffer = STM._buffers.get(user_id)
+            if buffer is None:
+                buffer = STM._buffers[user_id] = _UserBuffer(self.BUFFER_SIZE)
+                if len(STM._buffers) > self.USERS_MAX:
+                    for old_id, old in list(STM._buffers.items())[:len(STM._buffers) - self.USERS_MAX]:
+                        if not old.pending:
+                            del STM._buffers[old_id]
+            else:
+                STM._buffers.move_to_end(user_id)
+            return buffer
+
+    @staticmethod
+    def _stamped(message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Copy ``message`` with an ISO timestamp, matching the rows Supabase returns.
+
+        Stamping at save time (instead of the DB default at flush time) keeps
+        the stored order equal to the order the messages were saved in.
+        """
+        message = dict(message)
+        timestamp = message.get("timestamp")
+        if isinstance(timestamp, datetime):
+            message["timestamp"] = timestamp.isoformat()
+        elif not timestamp:
+            message["timestamp"] = datetime.now().isoformat()
+        return message
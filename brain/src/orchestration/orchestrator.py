@@ -2,7 +2,7 @@ import asyncio
 import logging
 import os
 import sys
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 from queue import Queue, Empty
 import threading
 import warnings
@@ -16,6 +16,9 @@ if brain_src_path not in sys.path:
 
 from autogen_core import CancellationToken
 from agents.mcp_agent import MCPAgent
+from brain_core.config import Config
+from brain_core.event_loop import new_event_loop
+from brain_core.semantic_cache import context_hash, get_semantic_cache
 from memory.memory_manager import MemoryManager
 from autogen_agentchat.messages import TextMessage, ModelClientStreamingChunkEvent
 from autogen_core.model_context import BufferedChatCompletionContext
@@ -38,8 +41,14 @@ class AgentOrchestrator:
         """Initialize orchestrator with user context and agents."""
         self.user_id = user_id
         self.max_turns = max_turns
+        # One token per chat session for the assistant; memory extraction runs on
+        # the pooled MemoryManager, which outlives the session, so it is not tied to it.
+        self.cancellation_token = CancellationToken()
+        # Loop running start_chat_stream's background thread, so cancel() can
+        # reach the token from the request thread
+        self._stream_loop = None
         try:
-            self.memory = MemoryManager(user_id=user_id)
+            self.memory = MemoryManager.get(user_id)
             self.access_token = access_token
             self.device_id = device_id
             # Create shared context for all agents
@@ -49,15 +58,63 @@ class AgentOrchestrator:
             logger.error(f"Failed to initialize orchestrator for user {user_id}: {e}", exc_info=True)
             raise
 
+    def cancel(self) -> None:
+        """Cancel in-flight model calls for this session, e.g. when the client disconnects."""
+        loop = self._stream_loop
+        if loop is not None:
+            try:
+                # The token cancels futures owned by the streaming loop
+                loop.call_soon_threadsafe(self.cancellation_token.cancel)
+                return
+            except RuntimeError:
+                # Loop already closed; nothing left in flight on it
+                pass
+        self.cancellation_token.cancel()
+
     async def _load_chat_history(self, message: str) -> str:
         """Load previous messages from memory into model context."""
-        context_string, previous_messages = self.memory.get_messages(message)
-        print(f"Context: {context_string}")
-        print(f"Previous messages: {previous_messages}")
+        # STM and LTM lookups are blocking Supabase/FAISS calls
+        context_string, previous_messages = await asyncio.to_thread(self.memory.get_messages, message)
+        # Reload from STM on every turn so a reused orchestrator doesn't duplicate history
+        await self.model_context.clear()
+        logger.debug("Context: %s", context_string)
+        logger.debug("Previous messages: %s", previous_messages)
         for msg in previous_messages:
             await self.model_context.add_message(msg)
         return context_string
 
+    async def _get_context_hash(self, context: str) -> str:
+        """
+        Hash the state a reply depends on: the user and the retrieved memories,
+        plus the last SEMANTIC_CACHE_HISTORY_TURNS turns (by default just the
+        previous assistant reply, which a short follow-up depends on).
+        """
+        history = await self.model_context.get_messages()
+        history_turns = Config.SEMANTIC_CACHE_HISTORY_TURNS
+        recent = history[-history_turns:] if history_turns > 0 else []
+        return context_hash(self.user_id, context, *(str(getattr(m, "content", "")) for m in recent))
+
+    async def _get_cached_response(self, task: str, ctx_hash: str) -> Optional[str]:
+        """Look up a semantically similar turn in the response cache."""
+        cache = get_semantic_cache()
+        if not cache:
+            return None
+        try:
+            return await asyncio.to_thread(cache.get, task, ctx_hash)
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed for user {self.user_id}: {e}")
+            return None
+
+    async def _set_cached_response(self, task: str, response: str, ctx_hash: str) -> None:
+        """Store a completed, tool-free assistant reply in the response cache."""
+        cache = get_semantic_cache()
+        if not cache:
+            return
+        try:
+            await asyncio.to_thread(cache.set, task, response, ctx_hash)
+        except Exception as e:
+            logger.warning(f"Semantic cache store failed for user {self.user_id}: {e}")
+
     def _save_to_memory(self, messages: list) -> None:
         """Save messages to persistent memory."""
         messages = [m for m in messages if m.get(
@@ -67,13 +124,11 @@ class AgentOrchestrator:
 
     def _create_assistant(self, context: str, enable_streaming: bool = False) -> MCPAgent:
         """Initialize the MCP assistant with tools."""
-        # Set access token, device_id, and user_id for system tool operations
-        if self.access_token:
-            set_access_token(self.access_token)
-        if self.device_id:
-            set_device_id(self.device_id)
-        if self.user_id:
-            set_user_id(self.user_id)
+        # Set access token, device_id, and user_id for system tool operations.
+        # They are context variables, scoped to this chat's task and its tool calls.
+        set_access_token(self.access_token)
+        set_device_id(self.device_id)
+        set_user_id(self.user_id)
         # Lazy import to avoid circular dependency
         from orchestration.system_tool import execute_system_intent
         
@@ -110,6 +165,20 @@ class AgentOrchestrator:
             })
         return normalized
 
+    def _save_turn(self, task_message: TextMessage, full_response: str) -> None:
+        """Persist the user message and the assistant reply to memory."""
+        try:
+            assistant_message = TextMessage(
+                content=full_response,
+                source="assistant",
+                created_at=datetime.now()
+            )
+            normalized = self._normalize_messages(task_message, assistant_message)
+            self._save_to_memory(normalized)
+            logger.debug(f"Saved conversation to memory for user: {self.user_id}")
+        except Exception as e:
+            logger.error(f"Failed to save conversation to memory for user {self.user_id}: {e}", exc_info=True)
+
     async def start_chat_stream_async(self, task: str) -> AsyncGenerator[str, None]:
         """
         Process user message through rule-based agent orchestration with streaming.
@@ -117,13 +186,15 @@ class AgentOrchestrator:
 
         Flow:
         1. Load previous conversation history
-        2. Stream assistant response
-        3. Save messages to memory
-        4. Yield response chunks
+        2. Serve from the semantic cache on a paraphrase hit
+        3. Stream assistant response
+        4. Save messages to memory (and cache tool-free replies)
+        5. Yield response chunks
         """
         assistant = None
         full_response = ""
         task_message = None
+        intent_executed = False
         
         try:
             task_message = TextMessage(
@@ -131,6 +202,17 @@ class AgentOrchestrator:
             
             # Step 1: Load previous conversation
             context = await self._load_chat_history(task)
+
+            # Serve paraphrased turns from the semantic cache, skipping the LLM call
+            ctx_hash = await self._get_context_hash(context)
+            cached_response = await self._get_cached_response(task, ctx_hash)
+            if cached_response:
+                logger.debug(f"Serving cached response for user {self.user_id}")
+                full_response = cached_response
+                yield cached_response
+                await asyncio.to_thread(self._save_turn, task_message, full_response)
+                return
+
             # Enrich context with the current date and time (UTC)
             current_datetime_utc = datetime.utcnow().isoformat() + "Z"
             context_with_time = f"{context}\n\nCurrent datetime (UTC): {current_datetime_utc}"
@@ -142,7 +224,7 @@ class AgentOrchestrator:
             assistant = self._create_assistant(context_with_time, enable_streaming=True)
 
             # Step 4: Stream the assistant response
-            cancellation_token = CancellationToken()
+            cancellation_token = self.cancellation_token
             tool_responses = []  # Track tool responses to include in final message
             
             async for event in assistant.on_messages_stream([task_message], cancellation_token):
@@ -230,6 +312,7 @@ class AgentOrchestrator:
                             logger.info(f"Detected execute_system_intent as text in assistant response (not tool call), executing: {extracted_intent}")
                             # Execute the intent
                             tool_result = await execute_system_intent(extracted_intent)
+                            intent_executed = True
                             if tool_result:
                                 # Yield the tool execution result
                                 yield f"\n\n[Executed: {extracted_intent}]\n{tool_result}\n"
@@ -241,17 +324,12 @@ class AgentOrchestrator:
             
             # Save to memory after streaming completes
             if task_message and full_response:
-                try:
-                    assistant_message = TextMessage(
-                        content=full_response, 
-                        source="assistant", 
-                        created_at=datetime.now()
-                    )
-                    normalized = self._normalize_messages(task_message, assistant_message)
-                    self._save_to_memory(normalized)
-                    logger.debug(f"Saved conversation to memory for user: {self.user_id}")
-                except Exception as e:
-                    logger.error(f"Failed to save conversation to memory for user {self.user_id}: {e}", exc_info=True)
+                await asyncio.to_thread(self._save_turn, task_message, full_response)
+
+            # Only cache replies that did not touch system state through a tool
+            if full_response and not tool_responses and not intent_executed \
+                    and "execute_system_intent" not in full_response:
+                await self._set_cached_response(task, full_response, ctx_hash)
 
         except (APIConnectionError, ConnectionError) as e:
             logger.error(f"Connection error in streaming for user {self.user_id}: {e}", exc_info=True)
@@ -273,14 +351,18 @@ class AgentOrchestrator:
             """Run the async generator in a separate thread with its own event loop."""
             loop = None
             try:
-                loop = asyncio.new_event_loop()
+                loop = new_event_loop()
                 asyncio.set_event_loop(loop)
+                self._stream_loop = loop
                 
                 async def consume():
                     try:
                         async for chunk in self.start_chat_stream_async(message):
                             queue.put(('chunk', chunk))
                         queue.put(('done', None))
+                    except asyncio.CancelledError:
+                        logger.debug(f"Chat stream cancelled for user {self.user_id}")
+                        queue.put(('done', None))
                     except Exception as e:
                         logger.error(f"Error in async generator for user {self.user_id}: {e}", exc_info=True)
                         exception_holder[0] = e
@@ -294,6 +376,7 @@ class AgentOrchestrator:
                 queue.put(('error', str(e)))
                 done.set()
             finally:
+                self._stream_loop = None
                 if loop:
                     try:
                         # Give a small delay for HTTP clients to finish cleanup
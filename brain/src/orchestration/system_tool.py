@@ -4,27 +4,57 @@ System Tool for executing user intents via SystemAgent.
 This module provides a tool function that can be used with autogen_agentchat
 to execute system-level tasks through the SystemAgent.
 """
-import json
 import asyncio
 import logging
 import re
+import threading
+from contextvars import ContextVar
 from typing import Optional, List, Dict, Any
 from autogen_core import CancellationToken
 from autogen_agentchat.messages import TextMessage
 from agents.system_agent import SystemAgent
 from datetime import datetime
+from brain_core.fast_json import JSONDecodeError, dumps, loads
 from brain_core.send_intent import send_intent
 from brain_core.sup_extractor import supabase_service
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
+# Shared keep-alive session for remote agent calls, created lazily on first use
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+
+
+def _get_http_session() -> requests.Session:
+    """Get the pooled HTTP session so repeat calls reuse TCP/TLS connections."""
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                session = requests.Session()
+                # Agent actions are POSTs and may not be idempotent: only
+                # connection failures are retried, never reads or 5xx responses
+                adapter = HTTPAdapter(
+                    pool_connections=16,
+                    pool_maxsize=32,
+                    max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.2),
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _http_session = session
+    return _http_session
+
 
 # Create a singleton SystemAgent instance to reuse across tool calls
 _system_agent_instance = None
 
 # Cache for user agents (to avoid repeated DB queries)
 _user_agents_cache: Dict[str, List[Dict[str, Any]]] = {}
+# Per-user agent lookup by id, built alongside _user_agents_cache
+_user_agents_by_id: Dict[str, Dict[str, Dict[str, Any]]] = {}
 
 def _get_user_active_agents(user_id: str) -> List[Dict[str, Any]]:
     """Fetch all active agents for a user from Supabase."""
@@ -38,16 +68,17 @@ def _get_user_active_agents(user_id: str) -> List[Dict[str, Any]]:
         
         # Cache the results
         _user_agents_cache[user_id] = agents
+        _user_agents_by_id[user_id] = {agent.get("id"): agent for agent in agents}
         logger.debug(f"Loaded {len(agents)} active agents for user: {user_id}")
         return agents
     except Exception as e:
         logger.error(f"Failed to fetch active agents for user {user_id}: {e}", exc_info=True)
         return []
 
-def _update_agent_last_used(installed_agent_id: str) -> None:
+async def _update_agent_last_used(installed_agent_id: str) -> None:
     """Update the last_used_at timestamp for an installed agent."""
     try:
-        supabase_service.update_agent_last_used(installed_agent_id)
+        await supabase_service.aupdate_agent_last_used(installed_agent_id)
     except Exception as e:
         logger.warning(f"Failed to update last_used_at for agent {installed_agent_id}: {e}")
 
@@ -56,11 +87,9 @@ def _get_tool_by_id(tool_id: str, user_id: Optional[str] = None) -> Optional[dic
     if not user_id:
         return None
     
-    agents = _get_user_active_agents(user_id)
-    for agent in agents:
-        if agent.get("id") == tool_id:
-            return agent
-    return None
+    if user_id not in _user_agents_by_id:
+        _get_user_active_agents(user_id)
+    return _user_agents_by_id.get(user_id, {}).get(tool_id)
 
 def _get_system_agent(user_id: Optional[str] = None) -> SystemAgent:
     """Get or create the SystemAgent instance with user's active agents."""
@@ -85,32 +114,28 @@ def _get_system_agent(user_id: Optional[str] = None) -> SystemAgent:
     return _system_agent_instance
 
 
-# Global access token storage (set by orchestrator)
-_access_token: Optional[str] = None
+# Per-request tool context (set by orchestrator). ContextVars rather than module
+# globals: concurrent chats on one worker each see their own values, and the
+# tool tasks autogen spawns inherit them from the chat task that set them.
+_access_token: ContextVar[Optional[str]] = ContextVar("system_tool_access_token", default=None)
+_device_id: ContextVar[Optional[str]] = ContextVar("system_tool_device_id", default=None)
+_user_id: ContextVar[Optional[str]] = ContextVar("system_tool_user_id", default=None)
 
 def set_access_token(token: Optional[str]) -> None:
     """Set the access token for system agent operations."""
-    global _access_token
-    _access_token = token
-
-# Global device_id storage (set by orchestrator)
-_device_id: Optional[str] = None
+    _access_token.set(token)
 
 def set_device_id(token: Optional[str]) -> None:
     """Set the device id for system agent operations."""
-    global _device_id
-    _device_id = token
-
-# Global user_id storage (set by orchestrator)
-_user_id: Optional[str] = None
+    _device_id.set(token)
 
 def set_user_id(user_id: Optional[str]) -> None:
     """Set the user id for system agent operations."""
-    global _user_id
-    _user_id = user_id
+    _user_id.set(user_id)
     # Clear cache when user changes to force refresh
     if user_id in _user_agents_cache:
         del _user_agents_cache[user_id]
+    _user_agents_by_id.pop(user_id, None)
 
 
 def extract_intent_from_text(text: str) -> Optional[str]:
@@ -147,19 +172,20 @@ def extract_intent_from_text(text: str) -> Optional[str]:
 def _send_http_request(access_url: str, payload: Dict[str, Any], headers: Dict[str, str]) -> str:
     """Synchronous helper function to send HTTP request."""
     try:
-        response = requests.post(
+        response = _get_http_session().post(
             access_url,
             json=payload,
             headers=headers,
-            timeout=30.0
+            timeout=(3.0, 30.0)
         )
         response.raise_for_status()
         
-        # Try to parse JSON response
+        # Try to parse JSON response (requests' decode error subclasses ValueError)
         try:
-            return json.dumps(response.json()) if isinstance(response.json(), dict) else response.text
-        except (ValueError, json.JSONDecodeError):
+            body = response.json()
+        except ValueError:
             return response.text
+        return dumps(body) if isinstance(body, dict) else response.text
     except requests.exceptions.Timeout:
         raise TimeoutError(f"Request to {access_url} timed out")
     except requests.exceptions.RequestException as e:
@@ -200,18 +226,22 @@ async def _send_to_remote_agent(access_url: str, action: str, data: Dict[str, An
 
 async def _execute_with_token(user_intent: str) -> str:
     """Internal function to execute intent with optional token."""
+    user_id = _user_id.get()
+    device_id = _device_id.get()
+    access_token = _access_token.get()
     try:
-        if not _user_id:
+        if not user_id:
             logger.warning("System intent executed without user_id")
             return "Error: User context not available."
         
-        logger.debug(f"Executing system intent for user {_user_id}: {user_intent[:100]}")
+        logger.debug(f"Executing system intent for user {user_id}: {user_intent[:100]}")
         
         # Get the SystemAgent instance with user's active agents
         try:
-            system_agent = _get_system_agent(_user_id)
+            # Agent lookup hits Supabase on a cache miss; keep it off the event loop
+            system_agent = await asyncio.to_thread(_get_system_agent, user_id)
         except Exception as e:
-            logger.error(f"Failed to get system agent for user {_user_id}: {e}", exc_info=True)
+            logger.error(f"Failed to get system agent for user {user_id}: {e}", exc_info=True)
             return "Error: Failed to initialize system agent."
         
         # Create a TextMessage from the user intent
@@ -231,12 +261,12 @@ async def _execute_with_token(user_intent: str) -> str:
                 cancellation_token
             )
         except Exception as e:
-            logger.error(f"SystemAgent execution failed for user {_user_id}: {e}", exc_info=True)
+            logger.error(f"SystemAgent execution failed for user {user_id}: {e}", exc_info=True)
             return "Error: System agent execution failed."
 
         # Extract the content from the response
         if not response or not response.chat_message:
-            logger.warning(f"No response from SystemAgent for user {_user_id}")
+            logger.warning(f"No response from SystemAgent for user {user_id}")
             return "No response generated from SystemAgent."
         
         content = response.chat_message.content
@@ -244,7 +274,7 @@ async def _execute_with_token(user_intent: str) -> str:
         
         # Parse the SystemAgent response (should be JSON: { "action": "", "id": "" })
         try:
-            action_data = json.loads(content_str.strip())
+            action_data = loads(content_str.strip())
             action = action_data.get("action", "")
             tool_id = action_data.get("id", "")
             
@@ -254,9 +284,9 @@ async def _execute_with_token(user_intent: str) -> str:
                 return content_str
             
             # Get agent details from database
-            agent = _get_tool_by_id(tool_id, _user_id)
+            agent = _get_tool_by_id(tool_id, user_id)
             if not agent:
-                logger.warning(f"Agent {tool_id} not found for user {_user_id}")
+                logger.warning(f"Agent {tool_id} not found for user {user_id}")
                 return f"Agent with ID '{tool_id}' not found or not active for this user."
             
             is_local = agent.get("local", False)
@@ -268,25 +298,25 @@ async def _execute_with_token(user_intent: str) -> str:
             # Update last_used_at timestamp
             installed_agent_id = agent.get("installed_agent_id")
             if installed_agent_id:
-                _update_agent_last_used(installed_agent_id)
+                await _update_agent_last_used(installed_agent_id)
             
             # Route based on local/remote
             if is_local:
                 # Local agent - send via relay server
-                if action and _device_id:
+                if action and device_id:
                     try:
-                        logger.debug(f"Sending action '{action}' to local agent via device {_device_id}")
+                        logger.debug(f"Sending action '{action}' to local agent via device {device_id}")
                         device_response = await send_intent(
-                            device_id=_device_id,
+                            device_id=device_id,
                             action=action,
                             data={"tool_id": tool_id,"user_intent": user_intent},
                             wait_for_response=True,
                             timeout=100.0,
-                            auth_token=_access_token
+                            auth_token=access_token
                         )
                         if device_response:
                             logger.info(f"Received response from local agent '{agent_name}'")
-                            return f"[Tool:{tool_id}]: {json.dumps(device_response) if isinstance(device_response, dict) else str(device_response)}"
+                            return f"[Tool:{tool_id}]: {dumps(device_response) if isinstance(device_response, dict) else str(device_response)}"
                         else:
                             logger.warning(f"No response received from local agent '{agent_name}'")
                             return f"Action '{action}' sent to local agent {agent_name}, but no response received."
@@ -305,7 +335,7 @@ async def _execute_with_token(user_intent: str) -> str:
                             access_url=access_url,
                             action=action,
                             data={"tool_id": tool_id, "agent_id": tool_id, "user_intent": user_intent},
-                            auth_token=_access_token
+                            auth_token=access_token
                         )
                         logger.info(f"Received response from remote agent '{agent_name}'")
                         return remote_response
@@ -316,13 +346,13 @@ async def _execute_with_token(user_intent: str) -> str:
                     logger.warning(f"Remote agent '{agent_name}' has no access_url configured")
                     return f"Remote agent '{agent_name}' has no access_url configured."
         
-        except json.JSONDecodeError:
+        except JSONDecodeError:
             # If response is not JSON, return as-is
             logger.debug(f"SystemAgent response is not JSON, returning as-is")
             return content_str
 
     except Exception as e:
-        logger.error(f"Unexpected error executing system intent for user {_user_id}: {e}", exc_info=True)
+        logger.error(f"Unexpected error executing system intent for user {user_id}: {e}", exc_info=True)
         return f"Error executing system intent: {str(e)}"
 
 async def execute_system_intent(intent: str | dict | None = None) -> str:
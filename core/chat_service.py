@@ -2,13 +2,21 @@
 Chat processing service for the Aven Speech API
 """
 import logging
-import json
 from flask import request, jsonify, Response, stream_with_context
 from brain.src.orchestration.orchestrator import AgentOrchestrator
-from brain.src.memory.memory_manager import MemoryManager
+# Import through the same module path as the orchestrator (brain/src is on
+# sys.path once it is imported) so both share one MemoryManager pool
+from memory.memory_manager import MemoryManager
+from brain_core.fast_json import JSONDecodeError, dumps_bytes, loads
 
 logger = logging.getLogger(__name__)
 
+# Server-sent event framing, encoded once
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+_DONE_FRAME = _SSE_PREFIX + dumps_bytes({"chunk": "", "done": True}) + _SSE_SUFFIX
+_ERROR_FRAME = _SSE_PREFIX + dumps_bytes({"error": "Streaming error occurred", "done": True}) + _SSE_SUFFIX
+
 
 
 class ChatService:
@@ -17,8 +25,14 @@ class ChatService:
     def process_chat_stream(self, user_id: str, access_token: str = None):
         """Process chat messages with streaming response"""
         try:
-            data = request.get_json()
-            if not data:
+            # Decode the raw body with orjson instead of Flask's stdlib-json get_json()
+            body = request.get_data(cache=False)
+            try:
+                data = loads(body) if body else None
+            except JSONDecodeError:
+                logger.warning(f"Invalid JSON from user: {user_id}")
+                return jsonify({"error": "Invalid JSON"}), 400
+            if not data or not isinstance(data, dict):
                 logger.warning(f"Empty request data from user: {user_id}")
                 return jsonify({"error": "No data provided"}), 400
             
@@ -43,32 +57,27 @@ class ChatService:
             
             def generate():
                 """Generator function that yields streaming chunks"""
+                completed = False
                 try:
                     chunk_count = 0
                     for chunk in orchestrator.start_chat_stream(message):
                         chunk_count += 1
-                        # Format as Server-Sent Events (SSE)
-                        chunk_data = json.dumps({
-                            "chunk": chunk,
-                            "done": False
-                        })
-                        yield f"data: {chunk_data}\n\n"
+                        # Format as Server-Sent Events (SSE), as bytes
+                        yield _SSE_PREFIX + dumps_bytes({"chunk": chunk, "done": False}) + _SSE_SUFFIX
 
                     logger.debug(f"Stream completed for user {user_id}, total chunks: {chunk_count}")
                     
                     # Send final done message
-                    done_data = json.dumps({
-                        "chunk": "",
-                        "done": True
-                    })
-                    yield f"data: {done_data}\n\n"
+                    yield _DONE_FRAME
+                    completed = True
                 except Exception as e:
                     logger.error(f"Error in chat stream generator for user {user_id}: {e}", exc_info=True)
-                    error_data = json.dumps({
-                        "error": "Streaming error occurred",
-                        "done": True
-                    })
-                    yield f"data: {error_data}\n\n"
+                    yield _ERROR_FRAME
+                finally:
+                    if not completed:
+                        # Client disconnected (or the stream failed): stop the
+                        # model call instead of generating for nobody
+                        orchestrator.cancel()
             
             return Response(
                 stream_with_context(generate()),
@@ -87,7 +96,7 @@ class ChatService:
         """Clear all chat history and memory data for a user"""
         try:
             logger.info(f"Clearing history for user: {user_id}")
-            memory_manager = MemoryManager(user_id=user_id)
+            memory_manager = MemoryManager.get(user_id)
             success = memory_manager.delete_all()
             
             if success:
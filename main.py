@@ -1,19 +1,28 @@
 import sys
 import os
+import atexit
 import logging
+import logging.handlers
+import queue
+import threading
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from core.chat_service import ChatService
 
 # region Configuration and Setup
-# Configure logging
+# Configure logging: request threads only enqueue records; a background
+# listener thread writes them to stdout
+_log_queue = queue.Queue(-1)
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler(sys.stdout))
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.StreamHandler(sys.stdout)
+        logging.handlers.QueueHandler(_log_queue)
     ]
 )
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
 # Suppress verbose third-party library logs
@@ -42,6 +51,28 @@ from core.auth_service import require_auth
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+
+
+def _warm_up():
+    """Open the outbound connections the first chat request would otherwise pay for"""
+    from brain_core.semantic_cache import get_semantic_cache
+    from memory.ltm_core.neo4j_db import get_driver
+
+    try:
+        cache = get_semantic_cache()
+        if cache:
+            cache.warmup()
+    except Exception as e:
+        logger.warning(f"Semantic cache warmup failed: {e}")
+    try:
+        # Creating the shared driver runs its constraint setup, leaving a pooled connection
+        get_driver()
+    except Exception as e:
+        logger.warning(f"Neo4j warmup failed: {e}")
+
+
+# Runs in each worker as it imports the app, off the request path
+threading.Thread(target=_warm_up, name="warmup", daemon=True).start()
 # endregion
 
 @app.route('/health', methods=['GET'])